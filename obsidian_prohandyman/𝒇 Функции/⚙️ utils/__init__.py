@@ -7,8 +7,9 @@ from .util_errors.exceptions import AppError, BadRequest, Unauthorized, Forbidde
 from .util_errors.to_response import app_error_to_http
 from .util_time.index import now_utc, parse_iso_utc, to_ts_us, from_ts_us, to_ts_ms, from_ts_ms
 from .util_json.index import loads_safe, dumps_compact, is_json_like
-from .util_crypto.password import hash_password, verify_password
-from .util_crypto.jwt_tokens import issue_jwt, verify_jwt
+from .util_cache.ttl_cache import TTLCache
+from .util_crypto.password import hash_password, verify_password, hash_password_async, verify_password_async, HashPolicy, hash_params, calibrate_hash_cost, password_policy_from_env
+from .util_crypto.jwt_tokens import issue_jwt, verify_jwt, token_kid, JwtKeySet, JwtVerifier, jwt_verifier, jwt_keyset_from_env, jwt_verifier_from_env
 from .util_ydb.driver import get_driver, get_session_pool, get_driver_from_env, get_session_pool_from_env
 
 try:
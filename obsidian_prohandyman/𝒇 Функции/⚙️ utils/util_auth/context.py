@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Mapping, Optional
+
+from ..util_json.index import dumps_compact, loads_safe
+
+# Контекст authorizer'а auth-gate — плоские строковые ключи, API Gateway кладет их в
+# requestContext.authorizer целевой функции. Клиент подделать их не может: контекст пишет только шлюз
+# по ответу authorizer'а, поэтому подпись не нужна, а читать его можно без JSON и без проверки JWT.
+#   user_id, email, phone_number — из токена;
+#   exp      — срок действия токена (unix-секунды) или "" для бессрочного;
+#   firm_id  — фирма запроса, для которой auth-gate разрешил роли ("" — не разрешались);
+#   roles    — роли пользователя в firm_id через запятую ("" — не член фирмы).
+# user_payload (JSON токена) сохраняется для функций, которые еще читают старый формат.
+CONTEXT_KEYS = ("user_id", "email", "phone_number", "exp", "firm_id", "roles")
+
+
+@dataclass(frozen=True)
+class AuthContext:
+    user_id: str
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    exp: Optional[int] = None
+    firm_id: Optional[str] = None
+    roles: Optional[FrozenSet[str]] = None  # None — роли не разрешались
+    source: str = "authorizer"               # authorizer | user_payload | jwt
+
+    def roles_for(self, firm_id: Optional[str]) -> Optional[FrozenSet[str]]:
+        """Роли в firm_id, если auth-gate разрешил их именно для этой фирмы; иначе None (проверять самим)."""
+        if self.roles is None or not firm_id or self.firm_id != firm_id:
+            return None
+        return self.roles
+
+
+def build_authorizer_context(
+    payload: Mapping[str, Any],
+    *,
+    firm_id: Optional[str] = None,
+    roles: Optional[Iterable[str]] = None,
+) -> Dict[str, str]:
+    """Контекст для ответа auth-gate {"isAuthorized": True, "context": ...}."""
+    exp = payload.get("exp")
+    return {
+        "user_id": str(payload.get("user_id") or payload.get("sub") or ""),
+        "email": str(payload.get("email") or ""),
+        "phone_number": str(payload.get("phone_number") or ""),
+        "exp": str(int(exp)) if isinstance(exp, (int, float)) else "",
+        "firm_id": firm_id if firm_id and roles is not None else "",
+        "roles": ",".join(sorted(roles)) if firm_id and roles is not None else "",
+        "user_payload": dumps_compact(dict(payload)),
+    }
+
+
+def _opt(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def _parse_roles(value: Any) -> FrozenSet[str]:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return frozenset(str(r) for r in value)
+    return frozenset(r for r in str(value or "").split(",") if r)
+
+
+def _from_payload(payload: Mapping[str, Any], source: str) -> Optional[AuthContext]:
+    user_id = str(payload.get("user_id") or payload.get("sub") or "").strip()
+    if not user_id:
+        return None
+    exp = payload.get("exp")
+    return AuthContext(
+        user_id=user_id,
+        email=_opt(payload.get("email")),
+        phone_number=_opt(payload.get("phone_number")),
+        exp=int(exp) if isinstance(exp, (int, float)) else None,
+        source=source,
+    )
+
+
+def _bearer(event: Mapping[str, Any]) -> Optional[str]:
+    for k, v in (event.get("headers") or {}).items():
+        if isinstance(k, str) and k.lower() == "authorization" and isinstance(v, str):
+            parts = v.strip().split()
+            if len(parts) == 2 and parts[0].lower() == "bearer":
+                return parts[1]
+    return None
+
+
+def auth_context_from_event(
+    event: Mapping[str, Any],
+    *,
+    verifier: Optional[Any] = None,
+) -> Optional[AuthContext]:
+    """
+    Идентичность вызывающего из события API Gateway:
+      1) плоский контекст auth-gate — словарные чтения, без JSON и без JWT;
+      2) user_payload (контекст старого auth-gate) — один loads_safe;
+      3) только если контекста нет и передан verifier (JwtVerifier) — локальная проверка Bearer JWT.
+    Возвращает AuthContext или None (нет контекста / токен невалиден).
+    """
+    authorizer = (event.get("requestContext") or {}).get("authorizer") or {}
+    user_id = authorizer.get("user_id")
+    if user_id:
+        firm_id = _opt(authorizer.get("firm_id"))
+        exp = authorizer.get("exp")
+        return AuthContext(
+            user_id=str(user_id),
+            email=_opt(authorizer.get("email")),
+            phone_number=_opt(authorizer.get("phone_number")),
+            exp=int(exp) if str(exp or "").isdigit() else None,
+            firm_id=firm_id,
+            roles=_parse_roles(authorizer.get("roles")) if firm_id else None,
+        )
+
+    raw = authorizer.get("user_payload")
+    if raw:
+        payload = loads_safe(raw) if isinstance(raw, (str, bytes)) else raw
+        return _from_payload(payload, "user_payload") if isinstance(payload, Mapping) else None
+
+    if verifier is not None:
+        token = _bearer(event)
+        if token:
+            try:
+                payload = verifier.verify(token)
+            except Exception:
+                return None
+            return _from_payload(payload, "jwt") if isinstance(payload, Mapping) else None
+    return None
+
+
+__all__ = (
+    "CONTEXT_KEYS",
+    "AuthContext",
+    "build_authorizer_context",
+    "auth_context_from_event",
+)
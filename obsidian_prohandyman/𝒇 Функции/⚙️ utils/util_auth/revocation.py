@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import os
+import zlib
+from typing import Any, Dict, Optional, Union
+
+from ..util_time.index import now_utc, to_ts_us
+from ..util_ydb.queries import execute_named, read_many, register_query
+
+# Эпохи отзыва токенов (таблица token_revocation_epochs в jwt-database).
+# Пользователи разложены по REVOCATION_BUCKETS корзинам; при замене jwt_token (refresh, сброс пароля)
+# epoch корзины пользователя переписывается текущим временем в мкс. auth-gate раз в секунду читает
+# всю таблицу одним запросом и выбрасывает из кеша токенов записи корзин, чья эпоха сменилась:
+# отзыв срабатывает сразу, а не через TTL кеша, и сбрасывает кеш только у 1/REVOCATION_BUCKETS пользователей.
+REVOCATION_BUCKETS = 64
+REVOCATION_TABLE = "token_revocation_epochs"
+# Включает эпохи у писателей (refresh-token, password-manager) и у auth-gate; таблица должна существовать
+REVOCATION_EPOCH_VAR = "TOKEN_REVOCATION_EPOCH"
+
+register_query("revocation.bump_epoch", f"""
+    UPSERT INTO `{REVOCATION_TABLE}` (bucket, epoch) VALUES ($bucket, $epoch);
+""", {"$bucket": "Uint32", "$epoch": "Uint64"})
+
+register_query("revocation.load_epochs", f"""
+    SELECT bucket, epoch FROM `{REVOCATION_TABLE}`;
+""")
+
+
+def revocation_epoch_enabled() -> bool:
+    return os.environ.get(REVOCATION_EPOCH_VAR, "false").lower() == "true"
+
+
+def revocation_bucket(user_id: str) -> int:
+    """Корзина эпохи отзыва пользователя (стабильна между процессами)."""
+    return zlib.crc32(user_id.encode("utf-8")) % REVOCATION_BUCKETS
+
+
+def bump_revocation_epoch(tx, user_id: str, *, commit_tx: bool = False) -> int:
+    """
+    Сдвигает эпоху корзины пользователя в транзакции tx — вызывать там же, где переписывается jwt_token.
+    Слепая запись без чтения. Возвращает новую эпоху.
+    """
+    epoch = to_ts_us(now_utc())
+    execute_named(tx, "revocation.bump_epoch", {"$bucket": revocation_bucket(user_id), "$epoch": epoch}, commit_tx=commit_tx)
+    return epoch
+
+
+def load_revocation_epochs(target, *, consistency: Union[str, Any] = "online") -> Dict[int, int]:
+    """Все эпохи: корзина -> epoch (корзины без записей отсутствуют). target — пул или сессия jwt-database."""
+    return {int(r["bucket"]): int(r["epoch"]) for r in read_many(target, "revocation.load_epochs", consistency=consistency)}
+
+
+def epoch_for(epochs: Optional[Dict[int, int]], user_id: str) -> int:
+    """Эпоха пользователя из результата load_revocation_epochs (0, если корзину не сдвигали)."""
+    return (epochs or {}).get(revocation_bucket(user_id), 0)
+
+
+__all__ = (
+    "REVOCATION_BUCKETS",
+    "REVOCATION_TABLE",
+    "REVOCATION_EPOCH_VAR",
+    "revocation_epoch_enabled",
+    "revocation_bucket",
+    "bump_revocation_epoch",
+    "load_revocation_epochs",
+    "epoch_for",
+)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+from ..util_ydb.queries import register_query
+
+# Поиск пользователя jwt-database по email/телефону через глобальные вторичные индексы users:
+#   email_idx — GLOBAL ON (email), phone_idx — GLOBAL ON (phone_number) (миграция в описании jwt-database).
+# Условие email = $email OR phone_number = $phone не покрывается одним индексом и читает всю таблицу —
+# время входа росло с числом пользователей. Здесь каждое условие — точечное чтение своего индекса (VIEW),
+# а при двух идентификаторах оба чтения объединяются UNION ALL в одном запросе (один round-trip).
+EMAIL_INDEX = "email_idx"
+PHONE_INDEX = "phone_idx"
+
+
+def register_user_lookup(prefix: str, columns: str, *, path_prefix: Optional[str] = None) -> None:
+    """
+    Объявляет запросы {prefix}.user_by_email, {prefix}.user_by_phone и {prefix}.user_by_email_or_phone.
+    columns — список колонок users через запятую. При двух идентификаторах совпадение по email приоритетнее
+    совпадения по телефону (раньше выбор OR ... LIMIT 1 был произвольным).
+    """
+    register_query(f"{prefix}.user_by_email", f"""
+        SELECT {columns}
+        FROM users VIEW {EMAIL_INDEX}
+        WHERE email = $email
+        LIMIT 1;
+    """, {"$email": "Utf8"}, path_prefix=path_prefix)
+
+    register_query(f"{prefix}.user_by_phone", f"""
+        SELECT {columns}
+        FROM users VIEW {PHONE_INDEX}
+        WHERE phone_number = $phone
+        LIMIT 1;
+    """, {"$phone": "Utf8"}, path_prefix=path_prefix)
+
+    register_query(f"{prefix}.user_by_email_or_phone", f"""
+        $found = (
+            SELECT {columns}, 0 AS lookup_rank FROM users VIEW {EMAIL_INDEX} WHERE email = $email
+            UNION ALL
+            SELECT {columns}, 1 AS lookup_rank FROM users VIEW {PHONE_INDEX} WHERE phone_number = $phone
+        );
+        SELECT {columns}
+        FROM $found
+        ORDER BY lookup_rank
+        LIMIT 1;
+    """, {"$email": "Utf8", "$phone": "Utf8"}, path_prefix=path_prefix)
+
+
+def user_lookup(prefix: str, email: Optional[str], phone: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    """Имя запроса register_user_lookup и параметры для переданных идентификаторов (хотя бы один обязателен)."""
+    if email and phone:
+        return f"{prefix}.user_by_email_or_phone", {"$email": email, "$phone": phone}
+    if email:
+        return f"{prefix}.user_by_email", {"$email": email}
+    if phone:
+        return f"{prefix}.user_by_phone", {"$phone": phone}
+    raise ValueError("user_lookup requires email or phone")
+
+
+__all__ = (
+    "EMAIL_INDEX",
+    "PHONE_INDEX",
+    "register_user_lookup",
+    "user_lookup",
+)
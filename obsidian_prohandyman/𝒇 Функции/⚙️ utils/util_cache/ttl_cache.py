@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Ограниченный LRU-кеш с TTL на запись, потокобезопасный. Живет в памяти процесса —
+    между вызовами одного инстанса функции, поэтому TTL задает, насколько устаревшим может быть ответ.
+    ttl_sec <= 0 или max_entries <= 0 выключают кеш (get всегда промах, set ничего не делает).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_sec: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_sec > 0 and self.max_entries > 0
+
+    def get(self, key: K, default: Any = None) -> Any:
+        """Значение или default, если записи нет или она истекла (истекшая удаляется)."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                if entry[0] > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: K, value: V, ttl_sec: Optional[float] = None) -> None:
+        """Кладет значение; ttl_sec переопределяет TTL кеша для этой записи."""
+        ttl = self.ttl_sec if ttl_sec is None else ttl_sec
+        if not self.enabled or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key: K, loader: Callable[[], V], ttl_sec: Optional[float] = None) -> V:
+        """Значение из кеша или loader() с сохранением. Исключение loader не кешируется."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value, ttl_sec)
+        return value
+
+    def pop(self, key: K, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+__all__ = ("TTLCache",)
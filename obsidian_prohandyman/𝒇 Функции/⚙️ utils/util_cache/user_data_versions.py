@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Union
+
+from ..util_time.index import now_utc, to_ts_us
+from ..util_ydb.queries import execute_named, read_many, register_query
+
+# Версии данных пользователя для get-user-data (таблица user_data_versions в firms-database).
+# Как эпохи отзыва (util_auth/revocation.py): пользователи разложены по USER_DATA_VERSION_BUCKETS корзинам,
+# писатели (create-firm, delete-firm, employee-manager, edit-integrations, invitation-codes-manager, register-confirm)
+# в своей транзакции переписывают
+# version корзин затронутых пользователей текущим временем в мкс. Читатель раз в refresh_sec загружает всю
+# таблицу одним запросом — версия пользователя (и ETag) известна без обращения к БД на каждый запрос.
+# Сдвиг корзины сбрасывает кеш и у соседей по корзине — это лишний пересчет, а не ошибка.
+# Корзин меньше 1000: вся таблица помещается в один result set (больше YDB обрезает).
+USER_DATA_VERSION_BUCKETS = 512
+USER_DATA_VERSIONS_TABLE = "user_data_versions"
+# Включает версии у писателей и у get-user-data; таблица должна существовать
+USER_DATA_VERSIONS_VAR = "USER_DATA_VERSIONS"
+
+register_query("user_data_versions.bump", f"""
+    UPSERT INTO `{USER_DATA_VERSIONS_TABLE}` SELECT * FROM AS_TABLE($rows);
+""", {"$rows": "List<Struct<bucket:Uint32,version:Uint64>>"})
+
+register_query("user_data_versions.load", f"""
+    SELECT bucket, version FROM `{USER_DATA_VERSIONS_TABLE}`;
+""")
+
+
+def user_data_versions_enabled() -> bool:
+    return os.environ.get(USER_DATA_VERSIONS_VAR, "false").lower() == "true"
+
+
+def user_data_bucket(user_id: str) -> int:
+    """Корзина версии пользователя (стабильна между процессами)."""
+    return zlib.crc32(user_id.encode("utf-8")) % USER_DATA_VERSION_BUCKETS
+
+
+def bump_user_data_versions(tx, user_ids: Iterable[str], *, commit_tx: bool = False) -> int:
+    """
+    Сдвигает версии корзин пользователей в транзакции tx — вызывать там же, где меняются их фирмы.
+    Один UPSERT на все корзины, без чтения. Без пользователей при commit_tx=True просто коммитит. Возвращает новую версию.
+    """
+    version = to_ts_us(now_utc())
+    buckets = sorted({user_data_bucket(u) for u in user_ids if u})
+    if buckets:
+        execute_named(tx, "user_data_versions.bump", {"$rows": [{"bucket": b, "version": version} for b in buckets]}, commit_tx=commit_tx)
+    elif commit_tx:
+        tx.commit()
+    return version
+
+
+def user_data_versions_from_rows(rows: Iterable[Mapping[str, Any]]) -> Dict[int, int]:
+    """Строки запроса user_data_versions.load -> корзина -> version (для асинхронного чтения через util_ydb.aio)."""
+    return {int(r["bucket"]): int(r["version"]) for r in rows}
+
+
+def load_user_data_versions(target, *, consistency: Union[str, Any] = "stale") -> Dict[int, int]:
+    """Все версии: корзина -> version (корзины без записей отсутствуют). target — пул или сессия firms-database."""
+    return user_data_versions_from_rows(read_many(target, "user_data_versions.load", consistency=consistency))
+
+
+class UserDataVersions:
+    """
+    Снимок версий в памяти инстанса: loader() -> {корзина: version} вызывается не чаще refresh_sec.
+    version(user_id) — версия пользователя или None, если снимок прочитать не удалось (тогда кешу не доверяем).
+    """
+
+    def __init__(self, loader: Callable[[], Dict[int, int]], *, refresh_sec: float = 1.0) -> None:
+        self._loader = loader
+        self._refresh_sec = refresh_sec
+        self._versions: Optional[Dict[int, int]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[Dict[int, int]]:
+        if self._loaded_at and time.monotonic() - self._loaded_at < self._refresh_sec:
+            return self._versions
+        with self._lock:
+            if self._loaded_at and time.monotonic() - self._loaded_at < self._refresh_sec:
+                return self._versions
+            try:
+                self._versions = self._loader()
+            except Exception:
+                self._versions = None
+            self._loaded_at = time.monotonic()
+            return self._versions
+
+    def version(self, user_id: str) -> Optional[int]:
+        versions = self.current()
+        return None if versions is None else versions.get(user_data_bucket(user_id), 0)
+
+
+__all__ = (
+    "USER_DATA_VERSION_BUCKETS",
+    "USER_DATA_VERSIONS_TABLE",
+    "USER_DATA_VERSIONS_VAR",
+    "user_data_versions_enabled",
+    "user_data_bucket",
+    "bump_user_data_versions",
+    "user_data_versions_from_rows",
+    "load_user_data_versions",
+    "UserDataVersions",
+)
@@ -1,22 +1,155 @@
 import datetime as dt
-from typing import Any, Dict, Optional, Tuple
+import functools
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
 import jwt
+from jwt.algorithms import get_default_algorithms
 
-def issue_jwt(subject: str, *, secret: str, claims: Optional[Dict[str, Any]] = None, expires_in_sec: Optional[int] = None, algorithm: str = "HS256") -> str:
+from ..util_cache.ttl_cache import TTLCache
+
+# Ключи для ротации: JSON-объект {"kid": "secret", ...}; порядок важен — первый ключ активный
+JWT_KEYS_VAR = "JWT_KEYS"
+# Ключ токенов без kid (выпущенных до ротации); без JWT_KEYS — единственный ключ, как раньше
+JWT_SECRET_VAR = "JWT_SECRET"
+
+def issue_jwt(subject: str, *, secret: str, claims: Optional[Dict[str, Any]] = None, expires_in_sec: Optional[int] = None, algorithm: str = "HS256", kid: Optional[str] = None) -> str:
     """
     По умолчанию НЕ выставляет exp (совместимо с 'бессрочными' токенами).
     Чтобы включить TTL: передай expires_in_sec (в секундах).
+    kid — идентификатор ключа в заголовке токена (см. JwtKeySet).
     """
     now = dt.datetime.now(dt.timezone.utc)
     payload = {"sub": subject, "iat": int(now.timestamp())}
     if expires_in_sec is not None:
         payload["exp"] = int((now + dt.timedelta(seconds=expires_in_sec)).timestamp())
     if claims: payload.update(claims)
-    return jwt.encode(payload, secret, algorithm=algorithm)
+    return jwt.encode(payload, secret, algorithm=algorithm, headers={"kid": kid} if kid else None)
 
 def verify_jwt(token: str, *, secret: str, verify_exp: bool = False, algorithms: Tuple[str, ...] = ("HS256",), leeway_sec: int = 30) -> Dict[str, Any]:
     """
     По умолчанию НЕ проверяет exp (совместимо с 'бессрочными').
     Включить проверку: verify_exp=True.
     """
-    return jwt.decode(token, secret, algorithms=list(algorithms), options={"verify_exp": verify_exp}, leeway=leeway_sec)
\ No newline at end of file
+    return jwt.decode(token, secret, algorithms=list(algorithms), options={"verify_exp": verify_exp}, leeway=leeway_sec)
+
+def token_kid(token: str) -> Optional[str]:
+    """kid из заголовка токена без проверки подписи (None — токен без kid). Битый токен — исключение PyJWT."""
+    return jwt.get_unverified_header(token).get("kid")
+
+
+class JwtKeySet:
+    """
+    Ключи HMAC для ротации без массового перелогина. keys — [(kid, secret), ...] по порядку: первым (активным)
+    подписываются новые токены, остальные только проверяют еще не переизданные. legacy_secret проверяет токены
+    без kid. Ключи готовятся один раз; при проверке ключ выбирается по kid из словаря.
+    """
+
+    def __init__(self, keys: Sequence[Tuple[str, str]] = (), *, legacy_secret: Optional[str] = None, algorithm: str = "HS256") -> None:
+        if not keys and not legacy_secret:
+            raise ValueError("JwtKeySet requires at least one key")
+        prepare = get_default_algorithms()[algorithm].prepare_key
+        self.algorithm = algorithm
+        self._keys: Dict[Optional[str], Any] = {}
+        for kid, secret in keys:
+            if not kid or kid in self._keys:
+                raise ValueError(f"Invalid or duplicate kid: {kid!r}")
+            self._keys[kid] = prepare(secret)
+        if legacy_secret:
+            self._keys[None] = prepare(legacy_secret)
+        self.active_kid: Optional[str] = keys[0][0] if keys else None
+        self._active_key = self._keys[self.active_kid]
+
+    @property
+    def kids(self) -> Tuple[Optional[str], ...]:
+        return tuple(self._keys)
+
+    def key_for(self, kid: Optional[str]) -> Any:
+        """Подготовленный ключ для kid или None, если такого ключа нет."""
+        return self._keys.get(kid)
+
+    def is_active(self, kid: Optional[str]) -> bool:
+        """True, если токен с этим kid переиздавать не нужно."""
+        return kid == self.active_kid
+
+    def issue(self, subject: str, *, claims: Optional[Dict[str, Any]] = None, expires_in_sec: Optional[int] = None) -> str:
+        """issue_jwt активным ключом (kid в заголовке)."""
+        return issue_jwt(subject, secret=self._active_key, claims=claims, expires_in_sec=expires_in_sec, algorithm=self.algorithm, kid=self.active_kid)
+
+
+class JwtVerifier:
+    """
+    verify_jwt для горячего пути: создается один раз на секрет (на инстанс функции).
+    Ключ подготовлен заранее (prepare_key алгоритма), список алгоритмов и options собраны один раз.
+    Успешные проверки кешируются по sha256 токена: повтор того же токена — поиск в LRU вместо HMAC и разбора JSON.
+    Запись живет до exp + leeway (при verify_exp), иначе cache_ttl_sec; кеш жестко ограничен cache_size.
+    Неуспешные проверки не кешируются. Отзыв токена кеш не отменяет — это stateful-проверка вызывающего.
+    """
+
+    def __init__(self, secret: Optional[str] = None, *, keyset: Optional[JwtKeySet] = None, verify_exp: bool = False,
+                 algorithms: Tuple[str, ...] = ("HS256",), leeway_sec: int = 30,
+                 cache_size: int = 10000, cache_ttl_sec: float = 300.0) -> None:
+        if (secret is None) == (keyset is None):
+            raise ValueError("JwtVerifier requires exactly one of secret or keyset")
+        self._keyset = keyset
+        if keyset is not None:
+            # Алгоритм задает набор ключей — alg из заголовка токена не выбирает ни ключ, ни алгоритм
+            algorithms = (keyset.algorithm,)
+        self._algorithms = list(algorithms)
+        # Один алгоритм — ключ готовим сразу; при нескольких подготовку делает jwt.decode по alg токена
+        self._key = get_default_algorithms()[algorithms[0]].prepare_key(secret) if secret is not None and len(algorithms) == 1 else secret
+        self._options = {"verify_exp": verify_exp}
+        self._verify_exp = verify_exp
+        self._leeway_sec = leeway_sec
+        self._cache: TTLCache = TTLCache(cache_size, cache_ttl_sec)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Как verify_jwt: dict payload или исключение PyJWT. Возвращает копию — кеш вызывающий не испортит."""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        payload = self._cache.get(digest)
+        if payload is not None:
+            return dict(payload)
+
+        key = self._key
+        if self._keyset is not None:
+            key = self._keyset.key_for(token_kid(token))
+            if key is None:
+                raise jwt.InvalidTokenError("Unknown key id")
+        payload = jwt.decode(token, key, algorithms=self._algorithms, options=self._options, leeway=self._leeway_sec)
+        exp = payload.get("exp")
+        ttl = None
+        if self._verify_exp and isinstance(exp, (int, float)):
+            ttl = min(self._cache.ttl_sec, exp + self._leeway_sec - time.time())
+        self._cache.set(digest, payload, ttl)
+        return dict(payload)
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+@functools.lru_cache(maxsize=16)
+def jwt_verifier(secret: str, *, verify_exp: bool = False, algorithms: Tuple[str, ...] = ("HS256",), leeway_sec: int = 30) -> JwtVerifier:
+    """Общий JwtVerifier процесса для набора параметров (создается при первом вызове)."""
+    return JwtVerifier(secret, verify_exp=verify_exp, algorithms=algorithms, leeway_sec=leeway_sec)
+
+
+@functools.lru_cache(maxsize=1)
+def jwt_keyset_from_env() -> JwtKeySet:
+    """
+    JwtKeySet из окружения, читается один раз на инстанс: JWT_KEYS (активный — первый) + JWT_SECRET для токенов без kid.
+    Без JWT_KEYS — один JWT_SECRET, токены без kid, как до ротации. Нет ни того, ни другого — RuntimeError.
+    """
+    raw = os.environ.get(JWT_KEYS_VAR)
+    keys = list(json.loads(raw).items()) if raw else []
+    legacy = os.environ.get(JWT_SECRET_VAR) or None
+    if not keys and not legacy:
+        raise RuntimeError(f"{JWT_KEYS_VAR} or {JWT_SECRET_VAR} not configured")
+    return JwtKeySet(keys, legacy_secret=legacy)
+
+
+@functools.lru_cache(maxsize=4)
+def jwt_verifier_from_env(*, verify_exp: bool = False, leeway_sec: int = 30) -> JwtVerifier:
+    """Общий JwtVerifier процесса по jwt_keyset_from_env()."""
+    return JwtVerifier(keyset=jwt_keyset_from_env(), verify_exp=verify_exp, leeway_sec=leeway_sec)
\ No newline at end of file
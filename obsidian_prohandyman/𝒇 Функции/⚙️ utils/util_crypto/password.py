@@ -1,5 +1,7 @@
-import hmac, hashlib, secrets
-from typing import Literal
+import functools, hmac, hashlib, os, secrets, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Literal, Optional, Tuple
 
 try:
     import bcrypt
@@ -7,16 +9,20 @@ try:
 except Exception:
     _HAS_BCRYPT = False
 
-def hash_password(password: str, *, format: Literal["legacy_bcrypt","bcrypt_tagged","pbkdf2"]="legacy_bcrypt", iterations: int = 200_000) -> str:
+BCRYPT_DEFAULT_ROUNDS = 12  # bcrypt.gensalt() по умолчанию
+PBKDF2_DEFAULT_ITERATIONS = 200_000
+
+def hash_password(password: str, *, format: Literal["legacy_bcrypt","bcrypt_tagged","pbkdf2"]="legacy_bcrypt", iterations: int = PBKDF2_DEFAULT_ITERATIONS, rounds: int = BCRYPT_DEFAULT_ROUNDS) -> str:
     """
     format:
       - legacy_bcrypt (по умолчанию): возвращает ЧИСТЫЙ bcrypt-хэш без префикса — ИДЕНТИЧНО твоим текущим записям БД.
       - bcrypt_tagged: вернёт 'bcrypt$<hash>' — удобно при миграциях/смешанных форматах.
       - pbkdf2: 'pbkdf2_sha256$<iterations>$<salt>$<hex>'.
+    Параметры хранятся в самом хеше (cost bcrypt — '$2b$<rounds>$...', итерации pbkdf2) — см. hash_params.
     """
     if format in ("legacy_bcrypt", "bcrypt_tagged"):
         if not _HAS_BCRYPT: raise RuntimeError("bcrypt not installed; use pbkdf2")
-        h = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        h = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
         return h if format == "legacy_bcrypt" else f"bcrypt${h}"
     elif format == "pbkdf2":
         salt = secrets.token_hex(16)
@@ -41,4 +47,126 @@ def verify_password(password: str, stored: str) -> bool:
     if _HAS_BCRYPT:
         try: return bcrypt.checkpw(password.encode("utf-8"), stored.encode("utf-8"))
         except Exception: return False
-    return False
\ No newline at end of file
+    return False
+
+def hash_params(stored: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    (семейство, cost) сохраненного хеша: ("bcrypt", rounds) для 'bcrypt$…' и чистого bcrypt,
+    ("pbkdf2", iterations) для 'pbkdf2_sha256$…'; (None, None) — формат не распознан.
+    """
+    try:
+        if stored.startswith("pbkdf2_sha256$"):
+            return "pbkdf2", int(stored.split("$", 2)[1])
+        h = stored.split("$", 1)[1] if stored.startswith("bcrypt$") else stored
+        if h.startswith("$2"):
+            return "bcrypt", int(h.split("$")[2])
+    except (IndexError, ValueError):
+        pass
+    return None, None
+
+@dataclass(frozen=True)
+class HashPolicy:
+    """
+    Целевые параметры хеширования. needs_rehash — с гистерезисом: хеш слабее политики переписывается всегда,
+    сильнее — только если заметно (bcrypt > +1 раунд, pbkdf2 > 2x итераций). Калибровка на разных инстансах
+    может дать соседние значения — без гистерезиса хеши переписывались бы туда-обратно.
+    """
+    format: str = "legacy_bcrypt"
+    rounds: int = BCRYPT_DEFAULT_ROUNDS
+    iterations: int = PBKDF2_DEFAULT_ITERATIONS
+
+    @property
+    def family(self) -> str:
+        return "pbkdf2" if self.format == "pbkdf2" else "bcrypt"
+
+    def hash(self, password: str) -> str:
+        return hash_password(password, format=self.format, iterations=self.iterations, rounds=self.rounds)
+
+    def needs_rehash(self, stored: str) -> bool:
+        family, cost = hash_params(stored)
+        if family is None:
+            return False  # неизвестный формат проверить все равно нельзя — не трогаем
+        if family != self.family:
+            return True
+        if family == "bcrypt":
+            return cost < self.rounds or cost > self.rounds + 1
+        return cost < self.iterations or cost > self.iterations * 2
+
+def _best_ms(fn, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+def calibrate_hash_cost(target_ms: float = 250.0, *, format: str = "legacy_bcrypt", min_rounds: int = 10, max_rounds: int = 14,
+                        min_iterations: int = 100_000, max_iterations: int = 2_000_000) -> HashPolicy:
+    """
+    Замеряет хеширование на текущем рантайме (CPU/память функции) и подбирает максимальный cost, при котором
+    один хеш укладывается в target_ms. bcrypt: cost растет вдвое на раунд, замер — на min_rounds.
+    pbkdf2: время линейно по итерациям, замер — на 20000 итераций. Границы min_*/max_* не дают уйти
+    ниже безопасного минимума на слабом инстансе и выше разумного на сильном.
+    """
+    if format == "pbkdf2":
+        probe = 20_000
+        ms = _best_ms(lambda: hashlib.pbkdf2_hmac("sha256", b"calibration", b"calibration-salt", probe))
+        iterations = int(probe * target_ms / max(ms, 1e-3)) // 1000 * 1000
+        return HashPolicy(format, iterations=max(min_iterations, min(max_iterations, iterations)))
+    if not _HAS_BCRYPT: raise RuntimeError("bcrypt not installed; use pbkdf2")
+    ms = _best_ms(lambda: bcrypt.hashpw(b"calibration", bcrypt.gensalt(min_rounds)))
+    rounds = min_rounds
+    while rounds < max_rounds and ms * 2 <= target_ms:
+        rounds += 1
+        ms *= 2
+    return HashPolicy(format, rounds=rounds)
+
+@functools.lru_cache(maxsize=1)
+def password_policy_from_env() -> HashPolicy:
+    """
+    Политика хеширования инстанса (читается один раз):
+      PASSWORD_HASH_FORMAT — legacy_bcrypt (по умолчанию) | bcrypt_tagged | pbkdf2;
+      PASSWORD_BCRYPT_ROUNDS / PASSWORD_PBKDF2_ITERATIONS — зафиксированный cost;
+      PASSWORD_HASH_TARGET_MS — если cost не зафиксирован: калибровка под это время на холодном старте.
+    Без переменных — прежние параметры (bcrypt 12 раундов, pbkdf2 200000): существующие хеши не переписываются.
+    """
+    fmt = os.environ.get("PASSWORD_HASH_FORMAT", "legacy_bcrypt")
+    if fmt not in ("legacy_bcrypt", "bcrypt_tagged", "pbkdf2"):
+        raise ValueError(f"Unknown PASSWORD_HASH_FORMAT '{fmt}'")
+    rounds = os.environ.get("PASSWORD_BCRYPT_ROUNDS")
+    iterations = os.environ.get("PASSWORD_PBKDF2_ITERATIONS")
+    target_ms = os.environ.get("PASSWORD_HASH_TARGET_MS")
+    pinned = iterations if fmt == "pbkdf2" else rounds
+    if target_ms and not pinned:
+        return calibrate_hash_cost(float(target_ms), format=fmt)
+    return HashPolicy(fmt, rounds=int(rounds or BCRYPT_DEFAULT_ROUNDS), iterations=int(iterations or PBKDF2_DEFAULT_ITERATIONS))
+
+# Пул хеширования: bcrypt и hashlib.pbkdf2_hmac отпускают GIL, поэтому хеши считаются параллельно с вводом-выводом
+# обработчика. Число потоков — PASSWORD_HASH_THREADS (по умолчанию 2): ограничивает CPU, который одновременные
+# запросы инстанса тратят на хеши.
+HASH_THREADS_VAR = "PASSWORD_HASH_THREADS"
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _hash_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=max(1, int(os.environ.get(HASH_THREADS_VAR, "2"))), thread_name_prefix="pwhash")
+    return _pool
+
+def hash_password_async(password: str, *, policy: Optional[HashPolicy] = None, **kwargs) -> "Future[str]":
+    """
+    hash_password в пуле потоков. Запускать ДО транзакции YDB (можно сразу после разбора запроса — хеш считается,
+    пока идут подключение и чтения), а результат брать future.result() между транзакциями: сессия и транзакция
+    не держатся на время bcrypt, и ретрай транзакции не пересчитывает хеш.
+    policy — хешировать по HashPolicy (обычно password_policy_from_env()), иначе kwargs как у hash_password.
+    """
+    if policy is not None:
+        return _hash_pool().submit(policy.hash, password)
+    return _hash_pool().submit(hash_password, password, **kwargs)
+
+def verify_password_async(password: str, stored: str) -> "Future[bool]":
+    """verify_password в пуле потоков — вызывать между чтением и условной записью, не внутри транзакции."""
+    return _hash_pool().submit(verify_password, password, stored)
\ No newline at end of file
@@ -0,0 +1,28 @@
+# util_http/etag.py
+from __future__ import annotations
+import hashlib
+from typing import Any, Optional
+
+def strong_etag(*parts: Any) -> str:
+    """Сильный ETag из частей версии (например, user_id, версия данных, версия формата ответа)."""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    True, если заголовок If-None-Match совпадает с etag (RFC 9110: слабое сравнение, список через запятую, "*").
+    Пустой или отсутствующий заголовок — False.
+    """
+    if not if_none_match:
+        return False
+    value = if_none_match.strip()
+    if value == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
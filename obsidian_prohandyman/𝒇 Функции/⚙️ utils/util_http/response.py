@@ -14,4 +14,8 @@ forbidden   = lambda msg="Forbidden", **kw: json_response(403, {"error":{"code":
 not_found   = lambda msg="Not Found", **kw: json_response(404, {"error":{"code":"not_found","message":msg}}, **kw)
 conflict    = lambda msg="Conflict", **kw: json_response(409, {"error":{"code":"conflict","message":msg}}, **kw)
 too_many    = lambda msg="Too Many Requests", **kw: json_response(429, {"error":{"code":"rate_limited","message":msg}}, **kw)
-server_error= lambda msg="Internal Server Error", **kw: json_response(500, {"error":{"code":"internal","message":msg}}, **kw)
\ No newline at end of file
+server_error= lambda msg="Internal Server Error", **kw: json_response(500, {"error":{"code":"internal","message":msg}}, **kw)
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """304 без тела: представление клиента (If-None-Match) актуально."""
+    return {"statusCode": 304, "headers": {"ETag": etag, **(headers or {})}, "body": ""}
\ No newline at end of file
@@ -6,11 +6,23 @@
 - Локальный JSON-файл authorized key
 """
 
-from util_yc_sa.loader import YcSaLoader
+from util_yc_sa.loader import (
+    YcSaLoader,
+    get_bootstrap_sdk,
+    read_lockbox_payload,
+    invalidate_lockbox_cache,
+    ydb_creds_from_lockbox,
+    ydb_creds_from_lockbox_env,
+)
 from util_yc_sa.types import SAContext, ServiceAccountObject
 
 __all__ = [
     "YcSaLoader",
+    "get_bootstrap_sdk",
+    "read_lockbox_payload",
+    "invalidate_lockbox_cache",
+    "ydb_creds_from_lockbox",
+    "ydb_creds_from_lockbox_env",
     "SAContext", 
     "ServiceAccountObject",
 ]
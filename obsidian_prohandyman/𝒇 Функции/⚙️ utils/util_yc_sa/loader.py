@@ -1,8 +1,9 @@
 from __future__ import annotations
 import json
-import tempfile
-from pathlib import Path
-from typing import Optional, Dict
+import os
+import threading
+import time
+from typing import Optional, Dict, Tuple
 
 from yandexcloud import SDK
 
@@ -16,6 +17,89 @@ from yandex.cloud.lockbox.v1.payload_service_pb2_grpc import PayloadServiceStub
 
 from util_yc_sa.types import SAContext, ServiceAccountObject
 
+# --------- КЕШ LOCKBOX (на процесс) ---------
+# Пиннутая версия (version_id) неизменна — кешируется бессрочно; "текущая" — на LOCKBOX_CACHE_TTL_SEC.
+_LOCKBOX_TTL_SEC = float(os.getenv("LOCKBOX_CACHE_TTL_SEC", "300"))
+_LOCKBOX_CACHE: Dict[Tuple[str, str], Tuple[float, Dict[str, str]]] = {}
+_LOCKBOX_KEY_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+_LOCKBOX_LOCK = threading.Lock()
+
+_BOOTSTRAP_SDK: Optional[SDK] = None
+_SDK_LOCK = threading.Lock()
+
+
+def get_bootstrap_sdk() -> SDK:
+    """Общий SDK рантайма (токен из метаданных), создается лениво один раз на процесс."""
+    global _BOOTSTRAP_SDK
+    if _BOOTSTRAP_SDK is None:
+        with _SDK_LOCK:
+            if _BOOTSTRAP_SDK is None:
+                _BOOTSTRAP_SDK = SDK()
+    return _BOOTSTRAP_SDK
+
+
+def read_lockbox_payload(secret_id: str, version_id: Optional[str] = None, *, sdk: Optional[SDK] = None, ttl_sec: Optional[float] = None) -> Dict[str, str]:
+    """
+    Содержимое секрета Lockbox с кешем по (secret_id, version_id).
+    Single-flight: при холодном кеше параллельные вызовы ждут один запрос к Lockbox.
+    """
+    cache_key = (secret_id, version_id or "")
+    entry = _LOCKBOX_CACHE.get(cache_key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+
+    with _LOCKBOX_LOCK:
+        key_lock = _LOCKBOX_KEY_LOCKS.setdefault(cache_key, threading.Lock())
+    with key_lock:
+        entry = _LOCKBOX_CACHE.get(cache_key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        stub = (sdk or get_bootstrap_sdk()).client(PayloadServiceStub)
+        req = GetPayloadRequest(secret_id=secret_id)
+        if version_id:
+            req.version_id = version_id
+        payload = stub.Get(req)
+        values = {e.key: (e.text_value or e.binary_value.decode("utf-8")) for e in payload.entries}
+
+        ttl = _LOCKBOX_TTL_SEC if ttl_sec is None else ttl_sec
+        expires_at = float("inf") if version_id else time.monotonic() + ttl
+        _LOCKBOX_CACHE[cache_key] = (expires_at, values)
+        return values
+
+
+def invalidate_lockbox_cache(secret_id: Optional[str] = None) -> None:
+    """Сбрасывает кеш целиком или только для secret_id."""
+    with _LOCKBOX_LOCK:
+        for cache_key in list(_LOCKBOX_CACHE.keys()):
+            if secret_id is None or cache_key[0] == secret_id:
+                _LOCKBOX_CACHE.pop(cache_key, None)
+
+
+def ydb_creds_from_lockbox(secret_id: str, version_id: Optional[str] = None, key_field: str = "key.json") -> "ydb.iam.ServiceAccountCredentials":
+    """Креденшелы YDB из authorized key в Lockbox: кешированное чтение + реестр креденшелов util_ydb."""
+    from ..util_ydb.credentials import ydb_creds_from_sa_key  # импорт здесь, чтобы не тащить в рантаймах без YDB
+    values = read_lockbox_payload(secret_id, version_id)
+    if key_field not in values:
+        raise KeyError(f"Поле '{key_field}' не найдено в Lockbox. Доступные: {list(values.keys())}")
+    return ydb_creds_from_sa_key(values[key_field])
+
+
+def ydb_creds_from_lockbox_env(
+    secret_var: str = "YC_LOCKBOX_SECRET_ID",
+    version_var: str = "YC_LOCKBOX_VERSION_ID",
+    key_field_var: str = "YC_LOCKBOX_KEY_FIELD",
+) -> "ydb.iam.ServiceAccountCredentials":
+    """То же, что ydb_creds_from_lockbox, но secret_id/version_id/key_field берутся из окружения."""
+    secret_id = os.environ.get(secret_var)
+    if not secret_id:
+        raise RuntimeError(f"{secret_var} not configured")
+    return ydb_creds_from_lockbox(
+        secret_id,
+        version_id=os.environ.get(version_var) or None,
+        key_field=os.environ.get(key_field_var, "key.json"),
+    )
+
 
 class YcSaLoader:
     """
@@ -27,9 +111,14 @@ class YcSaLoader:
     """
 
     def __init__(self, bootstrap_sdk: Optional[SDK] = None):
-        # Если выполняемся в Functions/VM c привязанным SA — SDK() возьмет токен из метаданных рантайма.
+        # Если выполняемся в Functions/VM c привязанным SA — общий SDK() возьмет токен из метаданных рантайма.
         # Иначе можно передать сюда заранее инициализированный SDK с любым валидным способом аутентификации.
-        self._bootstrap_sdk = bootstrap_sdk or SDK()
+        self._sdk_override = bootstrap_sdk
+
+    @property
+    def _bootstrap_sdk(self) -> SDK:
+        # Ленивый SDK: при попадании в кеш Lockbox он вообще не создается
+        return self._sdk_override or get_bootstrap_sdk()
 
     # --------- ПУБЛИЧНЫЕ МЕТОДЫ ---------
 
@@ -85,24 +174,16 @@ class YcSaLoader:
     @staticmethod
     def make_ydb_credentials_from_sa_key_dict(sa_key: Dict) -> "ydb.iam.ServiceAccountCredentials":
         """
-        YDB SDK в питоне принимает key-файл; готового from_dict нет.
-        Поэтому пишем во временный файл и используем from_file — это соответствует доке.
+        Креденшелы собираются в памяти через реестр util_ydb.credentials (без временного файла)
+        и мемоизируются по отпечатку ключа — повторные вызовы отдают тот же объект.
         """
-        import ydb, ydb.iam  # импорт здесь, чтобы не тащить в рантаймах без YDB
-        with tempfile.TemporaryDirectory() as td:
-            p = Path(td) / "sa.json"
-            p.write_text(json.dumps(sa_key), encoding="utf-8")
-            return ydb.iam.ServiceAccountCredentials.from_file(str(p))  # оф. способ
+        from ..util_ydb.credentials import ydb_creds_from_sa_key  # импорт здесь, чтобы не тащить в рантаймах без YDB
+        return ydb_creds_from_sa_key(sa_key)
 
     # --------- ВНУТРЕННЕЕ ---------
 
     def _read_lockbox_payload(self, secret_id: str, version_id: Optional[str]) -> Dict[str, str]:
-        stub = self._bootstrap_sdk.client(PayloadServiceStub)
-        req = GetPayloadRequest(secret_id=secret_id)
-        if version_id:
-            req.version_id = version_id
-        payload = stub.Get(req)
-        return {e.key: (e.text_value or e.binary_value.decode("utf-8")) for e in payload.entries}
+        return read_lockbox_payload(secret_id, version_id, sdk=self._sdk_override)
 
     def _extract_key_json(self, lockbox_values: Dict[str, str], key_field: str) -> Dict:
         if key_field not in lockbox_values:
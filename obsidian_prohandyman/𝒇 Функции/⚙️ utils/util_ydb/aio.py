@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Dict, List, Mapping, Optional, TypeVar, Union
+
+import ydb
+import ydb.aio
+import ydb.aio.iam
+
+from .driver import CacheKey, credentials_identity
+from .metrics import record_query, retry_operation_async as _instrumented_retry_async, tx_mode_name
+from .queries import KEEP_IN_CACHE, _tx_mode, get_query, rows_to_dicts
+
+T = TypeVar("T")
+
+# Асинхронный драйвер привязан к event loop. Хендлеры Cloud Functions синхронные, а asyncio.run()
+# на каждый вызов создаёт новый loop — кешированный драйвер бы умирал. Поэтому у процесса один
+# фоновый loop в daemon-потоке, и драйверы/пулы живут в нём между вызовами.
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+_ASYNC_POOLS: Dict[CacheKey, ydb.aio.SessionPool] = {}
+_ASYNC_DRIVERS: Dict[CacheKey, ydb.aio.Driver] = {}
+_ASYNC_CREDS: Dict[tuple, Any] = {}
+_POOL_LOCKS: Dict[CacheKey, asyncio.Lock] = {}
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Фоновый event loop процесса (создаётся при первом обращении)."""
+    global _LOOP
+    if _LOOP is None:
+        with _LOOP_LOCK:
+            if _LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ydb-aio-loop", daemon=True).start()
+                _LOOP = loop
+    return _LOOP
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Выполняет корутину в фоновом loop и ждёт результат из синхронного кода (хендлера)."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def async_credentials(credentials: Any) -> Any:
+    """
+    Асинхронный аналог синхронных креденшелов ydb.iam (тот же SA-ключ или метаданные).
+    Мемоизируется по credentials_identity, как и синхронный реестр.
+    """
+    identity = credentials_identity(credentials)
+    cached = _ASYNC_CREDS.get(identity)
+    if cached is not None:
+        return cached
+    if identity[0] == "sa_key":
+        creds = ydb.aio.iam.ServiceAccountCredentials(
+            credentials._account_id, credentials._access_key_id, credentials._private_key,
+        )
+    elif identity[0] == "metadata":
+        creds = ydb.aio.iam.MetadataUrlCredentials()
+    else:
+        # Анонимные/токен-креденшелы не делают I/O — подходят и для асинхронного драйвера
+        creds = credentials
+    _ASYNC_CREDS[identity] = creds
+    return creds
+
+
+async def get_async_pool(
+    endpoint: str,
+    database: str,
+    *,
+    credentials: Any,
+    wait_timeout_sec: float = 5.0,
+) -> ydb.aio.SessionPool:
+    """
+    Кешированный ydb.aio.SessionPool для endpoint/database (ключ кеша — как у синхронного get_session_pool).
+    Вызывать внутри фонового loop (через run()).
+    """
+    cache_key: CacheKey = (endpoint, database, credentials_identity(credentials))
+    pool = _ASYNC_POOLS.get(cache_key)
+    if pool is not None:
+        return pool
+
+    lock = _POOL_LOCKS.setdefault(cache_key, asyncio.Lock())
+    async with lock:
+        pool = _ASYNC_POOLS.get(cache_key)
+        if pool is not None:
+            return pool
+        driver = ydb.aio.Driver(endpoint=endpoint, database=database, credentials=async_credentials(credentials))
+        try:
+            await driver.wait(timeout=wait_timeout_sec, fail_fast=True)
+        except Exception:
+            await driver.stop()
+            raise
+        pool = ydb.aio.SessionPool(driver, size=10)
+        _ASYNC_DRIVERS[cache_key] = driver
+        _ASYNC_POOLS[cache_key] = pool
+        return pool
+
+
+async def retry_operation_async(pool: ydb.aio.SessionPool, callee, *args, op: Optional[str] = None, retry_settings: Optional[ydb.RetrySettings] = None, **kwargs):
+    """
+    Асинхронный аналог pool.retry_operation_sync: callee(session, *args, **kwargs) — корутина.
+    Ретраи и ожидание сессии попадают в metrics (ydb.operation).
+    """
+    return await _instrumented_retry_async(pool, callee, *args, op=op, retry_settings=retry_settings, **kwargs)
+
+
+async def execute_named_async(
+    tx,
+    name: str,
+    params: Optional[Mapping[str, Any]] = None,
+    *,
+    commit_tx: bool = False,
+    fmt: Optional[Mapping[str, str]] = None,
+):
+    """Асинхронный execute_named: запрос из реестра queries.py с keep_in_cache."""
+    query = get_query(name, fmt)
+    bound = query.bind(params)
+    started = time.perf_counter()
+    try:
+        result_sets = await tx.execute(query.data_query, bound, commit_tx=commit_tx, settings=KEEP_IN_CACHE)
+    except Exception as e:
+        record_query(name, (time.perf_counter() - started) * 1000, rows=0, tx_mode=tx_mode_name(tx), error=e)
+        raise
+    record_query(name, (time.perf_counter() - started) * 1000, rows=sum(len(rs.rows) for rs in result_sets), tx_mode=tx_mode_name(tx))
+    return result_sets
+
+
+async def read_sets_async(
+    target,
+    name: str,
+    params: Optional[Mapping[str, Any]] = None,
+    *,
+    consistency: Union[str, Any] = "online",
+    fmt: Optional[Mapping[str, str]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Асинхронный read_sets: target — ydb.aio.SessionPool (с ретраями) или асинхронная сессия."""
+    async def run_read(session) -> List[List[Dict[str, Any]]]:
+        tx = session.transaction(_tx_mode(consistency))
+        result_sets = await execute_named_async(tx, name, params, commit_tx=True, fmt=fmt)
+        return [rows_to_dicts(rs) for rs in result_sets]
+
+    if isinstance(target, ydb.aio.SessionPool):
+        return await retry_operation_async(target, run_read, op=name)
+    return await run_read(target)
+
+
+async def read_many_async(target, name: str, params: Optional[Mapping[str, Any]] = None, *, consistency: Union[str, Any] = "online", fmt: Optional[Mapping[str, str]] = None) -> List[Dict[str, Any]]:
+    return (await read_sets_async(target, name, params, consistency=consistency, fmt=fmt))[0]
+
+
+async def read_one_async(target, name: str, params: Optional[Mapping[str, Any]] = None, *, consistency: Union[str, Any] = "online", fmt: Optional[Mapping[str, str]] = None) -> Optional[Dict[str, Any]]:
+    rows = await read_many_async(target, name, params, consistency=consistency, fmt=fmt)
+    return rows[0] if rows else None
+
+
+async def _close_all_async() -> None:
+    for pool in list(_ASYNC_POOLS.values()):
+        try:
+            await pool.stop()
+        except Exception:
+            pass
+    for driver in list(_ASYNC_DRIVERS.values()):
+        try:
+            await driver.stop()
+        except Exception:
+            pass
+    _ASYNC_POOLS.clear()
+    _ASYNC_DRIVERS.clear()
+
+
+def close_all_async(timeout: float = 5.0) -> None:
+    """Останавливает асинхронные пулы и драйверы процесса."""
+    if _LOOP is not None:
+        run(_close_all_async(), timeout)
+
+
+__all__ = (
+    "get_loop",
+    "run",
+    "async_credentials",
+    "get_async_pool",
+    "retry_operation_async",
+    "execute_named_async",
+    "read_sets_async",
+    "read_many_async",
+    "read_one_async",
+    "close_all_async",
+)
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import datetime
+import hashlib
+import posixpath
+import time
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+
+import ydb
+
+from .metrics import record_query
+from .queries import execute_named, parse_type, register_query
+
+# Схема колонок: имя -> YQL-тип строкой ("Utf8", "Timestamp?") или объект типа ydb
+ColumnTypes = Mapping[str, Union[str, Any]]
+
+# BulkUpsert идёт мимо транзакций, и пачки могут быть крупнее: лимит gRPC-сообщения 64 МБ,
+# рекомендуемый размер пачки — единицы мегабайт.
+BULK_UPSERT_MAX_BYTES = 8 * 1024 * 1024
+# Параметр $rows транзакционного запроса: держим заметно меньше лимитов на размер запроса и мутаций
+TX_BATCH_MAX_BYTES = 1024 * 1024
+MAX_BATCH_ROWS = 10000
+
+# Накладные расходы на поле в protobuf Value (тег + длина), байт
+_FIELD_OVERHEAD = 2
+
+
+def _value_size(value: Any) -> int:
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.timedelta)):
+        return 8
+    if isinstance(value, (list, tuple)):
+        return sum(_value_size(v) + _FIELD_OVERHEAD for v in value)
+    if isinstance(value, dict):
+        return sum(_value_size(v) + _FIELD_OVERHEAD for v in value.values())
+    return len(str(value).encode("utf-8"))
+
+
+def row_size(row: Mapping[str, Any]) -> int:
+    """Оценка размера строки в сообщении YDB, байт (для нарезки пачек)."""
+    return sum(_value_size(v) + _FIELD_OVERHEAD for v in row.values())
+
+
+def chunk_rows(
+    rows: Iterable[Mapping[str, Any]],
+    max_bytes: int,
+    max_rows: int = MAX_BATCH_ROWS,
+) -> Iterator[List[Mapping[str, Any]]]:
+    """
+    Нарезает строки на пачки не больше max_bytes (по row_size) и max_rows.
+    Строка крупнее max_bytes уходит отдельной пачкой — пусть YDB решает, пролезает ли она.
+    """
+    chunk: List[Mapping[str, Any]] = []
+    size = 0
+    for row in rows:
+        rs = row_size(row)
+        if chunk and (size + rs > max_bytes or len(chunk) >= max_rows):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(row)
+        size += rs
+    if chunk:
+        yield chunk
+
+
+def _check_columns(table: str, rows: Sequence[Mapping[str, Any]], columns: Sequence[str]) -> None:
+    expected = set(columns)
+    for row in rows:
+        if row.keys() != expected:
+            raise ValueError(
+                f"Rows for '{table}': expected columns {sorted(expected)}, got {sorted(row.keys())}"
+            )
+
+
+def _bulk_columns(column_types: Union[ColumnTypes, Any]) -> Any:
+    if not isinstance(column_types, Mapping):
+        return column_types  # уже ydb.BulkUpsertColumns
+    columns = ydb.BulkUpsertColumns()
+    for name, spec in column_types.items():
+        columns.add_column(name, parse_type(spec))
+    return columns
+
+
+def _table_path(driver: ydb.Driver, table: str, database: Optional[str]) -> str:
+    if table.startswith("/"):
+        return table
+    root = database or driver._driver_config.database
+    return posixpath.join(root, table)
+
+
+def bulk_upsert(
+    driver: ydb.Driver,
+    table: str,
+    rows: Iterable[Mapping[str, Any]],
+    column_types: Union[ColumnTypes, Any],
+    *,
+    database: Optional[str] = None,
+    max_bytes: int = BULK_UPSERT_MAX_BYTES,
+    max_rows: int = MAX_BATCH_ROWS,
+    retry_settings: Optional[ydb.RetrySettings] = None,
+) -> int:
+    """
+    Запись строк через BulkUpsert: без сессии и транзакции, одна RPC на пачку.
+    Пачка атомарна сама по себе, но не вместе с другими — для вспомогательных данных,
+    где важна пропускная способность (логи, уведомления, бэкфиллы).
+    table — путь от корня базы (или абсолютный). column_types: {"id": "Utf8", "title": "Utf8?"}.
+    Каждая пачка ретраится отдельно (BulkUpsert идемпотентен). Возвращает число записанных строк.
+    """
+    path = _table_path(driver, table, database)
+    columns = _bulk_columns(column_types)
+    names = list(column_types) if isinstance(column_types, Mapping) else None
+    written = 0
+    for chunk in chunk_rows(rows, max_bytes, max_rows):
+        if names is not None:
+            _check_columns(table, chunk, names)
+        started = time.perf_counter()
+        try:
+            ydb.retry_operation_sync(
+                lambda: driver.table_client.bulk_upsert(path, chunk, columns), retry_settings,
+            )
+        except Exception as e:
+            record_query(f"bulk_upsert:{table}", (time.perf_counter() - started) * 1000, rows=0, tx_mode="bulk", error=e)
+            raise
+        record_query(f"bulk_upsert:{table}", (time.perf_counter() - started) * 1000, rows=len(chunk), tx_mode="bulk")
+        written += len(chunk)
+    return written
+
+
+def _batch_query_name(kind: str, table: str, schema: Sequence[tuple]) -> str:
+    signature = ",".join(f"{n}:{t}" for n, t in schema)
+    return f"{kind}.{table}.{hashlib.sha1(signature.encode('utf-8')).hexdigest()[:8]}"
+
+
+_BATCH_STATEMENTS = {
+    "upsert_rows": "UPSERT INTO `{table}` SELECT * FROM AS_TABLE($rows);",
+    "delete_rows": "DELETE FROM `{table}` ON SELECT * FROM AS_TABLE($rows);",
+    "update_rows": "UPDATE `{table}` ON SELECT * FROM AS_TABLE($rows);",
+}
+
+
+def _register_batch_query(kind: str, table: str, column_types: ColumnTypes, path_prefix: Optional[str]) -> str:
+    schema = [(name, spec if isinstance(spec, str) else str(spec)) for name, spec in column_types.items()]
+    struct = ",".join(f"{n}:{t}" for n, t in schema)
+    name = _batch_query_name(kind, table, schema)
+    register_query(
+        name,
+        _BATCH_STATEMENTS[kind].format(table=table),
+        {"$rows": f"List<Struct<{struct}>>"},
+        path_prefix=path_prefix,
+    )
+    return name
+
+
+def _execute_batches(
+    kind: str,
+    tx,
+    table: str,
+    rows: Iterable[Mapping[str, Any]],
+    column_types: ColumnTypes,
+    *,
+    commit_tx: bool,
+    max_bytes: int,
+    max_rows: int,
+    path_prefix: Optional[str],
+) -> int:
+    name = _register_batch_query(kind, table, column_types, path_prefix)
+    chunks = list(chunk_rows(rows, max_bytes, max_rows))
+    for i, chunk in enumerate(chunks):
+        _check_columns(table, chunk, list(column_types))
+        # Коммит — вместе с последней пачкой, без отдельного round-trip
+        execute_named(tx, name, {"$rows": list(chunk)}, commit_tx=commit_tx and i == len(chunks) - 1)
+    if commit_tx and not chunks:
+        tx.commit()
+    return sum(len(c) for c in chunks)
+
+
+def upsert_rows(
+    tx,
+    table: str,
+    rows: Iterable[Mapping[str, Any]],
+    column_types: ColumnTypes,
+    *,
+    commit_tx: bool = False,
+    max_bytes: int = TX_BATCH_MAX_BYTES,
+    max_rows: int = MAX_BATCH_ROWS,
+    path_prefix: Optional[str] = None,
+) -> int:
+    """
+    Транзакционная пакетная запись: UPSERT INTO `table` SELECT * FROM AS_TABLE($rows).
+    Пачка — один запрос вместо запроса на строку; пачки режутся по max_bytes и идут в той же транзакции tx.
+    Запрос регистрируется в реестре queries.py (keep_in_cache, метрики) по таблице и набору колонок.
+    Возвращает число строк.
+    """
+    return _execute_batches(
+        "upsert_rows", tx, table, rows, column_types,
+        commit_tx=commit_tx, max_bytes=max_bytes, max_rows=max_rows, path_prefix=path_prefix,
+    )
+
+
+def delete_rows(
+    tx,
+    table: str,
+    keys: Iterable[Mapping[str, Any]],
+    key_types: ColumnTypes,
+    *,
+    commit_tx: bool = False,
+    max_bytes: int = TX_BATCH_MAX_BYTES,
+    max_rows: int = MAX_BATCH_ROWS,
+    path_prefix: Optional[str] = None,
+) -> int:
+    """
+    Пакетное удаление по первичному ключу: DELETE FROM `table` ON SELECT * FROM AS_TABLE($rows).
+    keys — dict с колонками первичного ключа, key_types — их типы. Остальное как у upsert_rows.
+    """
+    return _execute_batches(
+        "delete_rows", tx, table, keys, key_types,
+        commit_tx=commit_tx, max_bytes=max_bytes, max_rows=max_rows, path_prefix=path_prefix,
+    )
+
+
+def update_rows(
+    tx,
+    table: str,
+    rows: Iterable[Mapping[str, Any]],
+    column_types: ColumnTypes,
+    *,
+    commit_tx: bool = False,
+    max_bytes: int = TX_BATCH_MAX_BYTES,
+    max_rows: int = MAX_BATCH_ROWS,
+    path_prefix: Optional[str] = None,
+) -> int:
+    """
+    Пакетное обновление: UPDATE `table` ON SELECT * FROM AS_TABLE($rows).
+    rows — первичный ключ + обновляемые колонки; строки, которых нет в таблице, пропускаются (в отличие от UPSERT).
+    Остальное как у upsert_rows.
+    """
+    return _execute_batches(
+        "update_rows", tx, table, rows, column_types,
+        commit_tx=commit_tx, max_bytes=max_bytes, max_rows=max_rows, path_prefix=path_prefix,
+    )
+
+
+__all__ = (
+    "BULK_UPSERT_MAX_BYTES",
+    "TX_BATCH_MAX_BYTES",
+    "MAX_BATCH_ROWS",
+    "row_size",
+    "chunk_rows",
+    "bulk_upsert",
+    "upsert_rows",
+    "delete_rows",
+    "update_rows",
+)
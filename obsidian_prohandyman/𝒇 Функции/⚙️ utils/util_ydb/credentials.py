@@ -1,11 +1,98 @@
+from __future__ import annotations
+
+import hashlib
+import json
 import os
+import threading
+from typing import Any, Dict, Tuple, Union
+
 import ydb
+import ydb.iam
+
+# Процессный реестр креденшелов: один объект (и один рефрешер IAM-токена) на ключ SA.
+_CREDS_CACHE: Dict[Tuple[str, ...], Any] = {}
+_CREDS_LOCK = threading.Lock()
+
+
+def sa_key_fingerprint(sa_key: Dict[str, Any]) -> str:
+    """Отпечаток authorized key без приватной части: account_id + key id."""
+    account_id = sa_key.get("service_account_id") or sa_key.get("user_account_id") or ""
+    raw = f"{account_id}:{sa_key.get('id', '')}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _parse_sa_key(sa_key: Union[Dict[str, Any], str, bytes]) -> Dict[str, Any]:
+    if isinstance(sa_key, (str, bytes)):
+        sa_key = json.loads(sa_key)
+    if not isinstance(sa_key, dict) or "id" not in sa_key or "private_key" not in sa_key:
+        raise ValueError("SA key must be an authorized key JSON with 'id' and 'private_key'")
+    return sa_key
+
+
+def _memoized(cache_key: Tuple[str, ...], factory):
+    creds = _CREDS_CACHE.get(cache_key)
+    if creds is not None:
+        return creds
+    with _CREDS_LOCK:
+        creds = _CREDS_CACHE.get(cache_key)
+        if creds is None:
+            creds = factory()
+            _CREDS_CACHE[cache_key] = creds
+        return creds
+
+
+def ydb_creds_from_sa_key(sa_key: Union[Dict[str, Any], str, bytes]) -> "ydb.iam.ServiceAccountCredentials":
+    """
+    Креденшелы YDB из authorized key (dict или JSON) — в памяти, без временных файлов.
+    Мемоизируются по отпечатку ключа, поэтому все пулы процесса делят один кеш IAM-токена.
+    """
+    key = _parse_sa_key(sa_key)
+    account_id = key.get("service_account_id") or key.get("user_account_id")
+    return _memoized(
+        ("sa_key", sa_key_fingerprint(key)),
+        lambda: ydb.iam.ServiceAccountCredentials(account_id, key["id"], key["private_key"]),
+    )
+
+
+def ydb_creds_from_sa_file(path: str) -> "ydb.iam.ServiceAccountCredentials":
+    """
+    Креденшелы из файла ключа. Файл читается без _CREDS_LOCK (он не реентерабельный),
+    один объект на ключ дает мемоизация ydb_creds_from_sa_key по отпечатку.
+    """
+    with open(os.path.expanduser(path), "r", encoding="utf-8") as f:
+        return ydb_creds_from_sa_key(f.read())
+
+
+def metadata_creds() -> "ydb.iam.MetadataUrlCredentials":
+    """Единственный на процесс MetadataUrlCredentials (токен SA, привязанного к функции)."""
+    return _memoized(("metadata",), ydb.iam.MetadataUrlCredentials)
+
 
 def ydb_creds_from_env():
+    """
+    Приоритет: SA_KEY_JSON (ключ целиком в ENV, из Lockbox) → SA_KEY_FILE → метаданные рантайма.
+    Повторные вызовы возвращают тот же объект креденшелов.
+    """
+    sa_key_json = os.environ.get("SA_KEY_JSON")
+    if sa_key_json:
+        return ydb_creds_from_sa_key(sa_key_json)
     sa_key_file = os.environ.get("SA_KEY_FILE")
     if sa_key_file:
-        return ydb.iam.ServiceAccountCredentials.from_file(sa_key_file)
-    try:
-        return ydb.iam.MetadataUrlCredentials()
-    except Exception:
-        return ydb.iam.MetadataUrlCredentials()
+        return ydb_creds_from_sa_file(sa_key_file)
+    return metadata_creds()
+
+
+def reset_credentials_cache() -> None:
+    """Сбрасывает реестр (например, после ротации ключа)."""
+    with _CREDS_LOCK:
+        _CREDS_CACHE.clear()
+
+
+__all__ = (
+    "sa_key_fingerprint",
+    "ydb_creds_from_sa_key",
+    "ydb_creds_from_sa_file",
+    "metadata_creds",
+    "ydb_creds_from_env",
+    "reset_credentials_cache",
+)
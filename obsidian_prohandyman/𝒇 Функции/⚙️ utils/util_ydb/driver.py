@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
 import os
 import threading
-from typing import Any, Dict, Optional, Tuple
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
 
 import ydb
 
-_DRIVER_CACHE: Dict[Tuple[str, str, str], ydb.Driver] = {}
-_POOL_CACHE: Dict[Tuple[str, str, str], ydb.SessionPool] = {}
-_CACHE_LOCK = threading.Lock()
+CacheKey = Tuple[str, str, Tuple[str, ...]]
+
+_DRIVER_CACHE: "OrderedDict[CacheKey, ydb.Driver]" = OrderedDict()
+_POOL_CACHE: "OrderedDict[CacheKey, ydb.SessionPool]" = OrderedDict()
+# RLock: invalidate()/close_all() вызывают _close_entry() под блокировкой; driver.wait() идет вне нее
+_CACHE_LOCK = threading.RLock()
+_MAX_CACHED_DRIVERS = int(os.getenv("YDB_DRIVER_CACHE_SIZE", "8"))
+_WARMUPS: Dict[CacheKey, "WarmUp"] = {}
+_KEY_LOCKS: Dict[CacheKey, threading.Lock] = {}
 
 
 def _require_env(name: str) -> str:
@@ -25,8 +35,118 @@ def _resolve_sa_key(sa_key_file: Optional[str], sa_key_var: Optional[str]) -> st
     return _require_env(env_name)
 
 
-def _build_key(endpoint: str, database: str, sa_key_file: str) -> Tuple[str, str, str]:
-    return endpoint, database, sa_key_file
+def _digest(*parts: Any) -> str:
+    raw = "\x1f".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def credentials_identity(credentials: Any) -> Tuple[str, ...]:
+    """
+    Returns a stable, secret-free identity for a credentials object.
+
+    Two credentials objects with the same identity authenticate as the same principal,
+    so a driver built for one of them can be reused for the other:
+      * service account key  -> fingerprint of (account_id, key id)
+      * metadata credentials -> single process-wide identity
+      * static token         -> digest of the token
+      * anything else        -> the object itself (cached entry keeps it alive)
+    """
+    if credentials is None:
+        return ("none",)
+    key_id = getattr(credentials, "_access_key_id", None)
+    if key_id:
+        return ("sa_key", _digest(getattr(credentials, "_account_id", ""), key_id))
+    if isinstance(credentials, ydb.iam.MetadataUrlCredentials):
+        return ("metadata",)
+    if isinstance(credentials, ydb.AnonymousCredentials):
+        return ("anonymous",)
+    token = getattr(credentials, "_token", None)
+    if isinstance(token, str) and token:
+        return ("token", _digest(token))
+    return ("object", type(credentials).__name__, str(id(credentials)))
+
+
+def _build_key(endpoint: str, database: str, identity: Tuple[str, ...]) -> CacheKey:
+    return endpoint, database, identity
+
+
+def _close_entry(cache_key: CacheKey) -> None:
+    """Stops pool and driver for the key. Must be called under _CACHE_LOCK."""
+    pool = _POOL_CACHE.pop(cache_key, None)
+    driver = _DRIVER_CACHE.pop(cache_key, None)
+    if pool is not None:
+        try:
+            pool.stop()
+        except Exception:
+            pass
+    if driver is not None:
+        try:
+            driver.stop()
+        except Exception:
+            pass
+
+
+def _evict_overflow() -> None:
+    while len(_DRIVER_CACHE) > max(_MAX_CACHED_DRIVERS, 1):
+        oldest_key = next(iter(_DRIVER_CACHE))
+        _close_entry(oldest_key)
+
+
+def _cache_hit(cache: "OrderedDict[CacheKey, Any]", cache_key: CacheKey) -> Any:
+    """
+    Returns the cached driver/pool for the key (or None) and marks the key as most recently used,
+    so _evict_overflow() closes the least recently used entry rather than the oldest one.
+    """
+    with _CACHE_LOCK:
+        value = cache.get(cache_key)
+        if value is not None and cache_key in _DRIVER_CACHE:
+            _DRIVER_CACHE.move_to_end(cache_key)
+        return value
+
+
+def _get_or_create_driver(cache_key: CacheKey, endpoint: str, database: str, credentials: Any, wait_timeout_sec: float) -> ydb.Driver:
+    driver = _cache_hit(_DRIVER_CACHE, cache_key)
+    if driver is not None:
+        return driver
+
+    # Per-key lock: concurrent callers of one key wait for a single handshake,
+    # while drivers for different databases connect in parallel (see DatabaseRouter.connect)
+    with _CACHE_LOCK:
+        key_lock = _KEY_LOCKS.setdefault(cache_key, threading.Lock())
+    with key_lock:
+        with _CACHE_LOCK:
+            driver = _DRIVER_CACHE.get(cache_key)
+            if driver is not None:
+                _DRIVER_CACHE.move_to_end(cache_key)
+                return driver
+        driver = ydb.Driver(endpoint=endpoint, database=database, credentials=credentials)
+        try:
+            driver.wait(timeout=wait_timeout_sec, fail_fast=True)
+        except Exception:
+            driver.stop()
+            raise
+        with _CACHE_LOCK:
+            _DRIVER_CACHE[cache_key] = driver
+            _evict_overflow()
+        return driver
+
+
+def _get_or_create_pool(cache_key: CacheKey, endpoint: str, database: str, credentials: Any, wait_timeout_sec: float) -> ydb.SessionPool:
+    pool = _cache_hit(_POOL_CACHE, cache_key)
+    if pool is not None:
+        return pool
+
+    while True:
+        driver = _get_or_create_driver(cache_key, endpoint, database, credentials, wait_timeout_sec)
+        with _CACHE_LOCK:
+            pool = _POOL_CACHE.get(cache_key)
+            if pool is not None:
+                return pool
+            if _DRIVER_CACHE.get(cache_key) is not driver:
+                continue  # evicted between handshake and pool creation
+            pool = ydb.SessionPool(driver)
+            _POOL_CACHE[cache_key] = pool
+            return pool
 
 
 def get_driver(
@@ -41,29 +161,20 @@ def get_driver(
     """
     Lazily creates (and caches) a YDB driver for the provided endpoint/database pair.
 
-    If ``credentials`` is provided the driver will not be cached.
+    With explicit ``credentials`` the cache key uses ``credentials_identity(credentials)``,
+    so a fresh credentials object for the same principal reuses the warm driver.
     """
     if credentials is not None:
-        driver = ydb.Driver(endpoint=endpoint, database=database, credentials=credentials)
-        driver.wait(timeout=wait_timeout_sec, fail_fast=True)
-        return driver
+        cache_key = _build_key(endpoint, database, credentials_identity(credentials))
+        return _get_or_create_driver(cache_key, endpoint, database, credentials, wait_timeout_sec)
 
     resolved_sa = _resolve_sa_key(sa_key_file, sa_key_var)
-    cache_key = _build_key(endpoint, database, resolved_sa)
-
-    driver = _DRIVER_CACHE.get(cache_key)
-    if driver:
-        return driver
-
-    with _CACHE_LOCK:
-        driver = _DRIVER_CACHE.get(cache_key)
-        if driver:
-            return driver
-        creds = ydb.iam.ServiceAccountCredentials.from_file(resolved_sa)
-        driver = ydb.Driver(endpoint=endpoint, database=database, credentials=creds)
-        driver.wait(timeout=wait_timeout_sec, fail_fast=True)
-        _DRIVER_CACHE[cache_key] = driver
+    cache_key = _build_key(endpoint, database, ("sa_file", resolved_sa))
+    driver = _cache_hit(_DRIVER_CACHE, cache_key)
+    if driver is not None:
         return driver
+    creds = ydb.iam.ServiceAccountCredentials.from_file(resolved_sa)
+    return _get_or_create_driver(cache_key, endpoint, database, creds, wait_timeout_sec)
 
 
 def get_session_pool(
@@ -76,27 +187,174 @@ def get_session_pool(
     credentials: Optional[Any] = None,
 ) -> ydb.SessionPool:
     """
-    Returns a cached session pool bound to a cached driver (unless explicit credentials supplied).
+    Returns a cached session pool bound to a cached driver.
+
+    Explicit ``credentials`` are cached by identity (see ``credentials_identity``).
     """
     if credentials is not None:
-        driver = get_driver(endpoint, database, sa_key_file=sa_key_file, sa_key_var=sa_key_var, wait_timeout_sec=wait_timeout_sec, credentials=credentials)
-        return ydb.SessionPool(driver)
+        cache_key = _build_key(endpoint, database, credentials_identity(credentials))
+        return _get_or_create_pool(cache_key, endpoint, database, credentials, wait_timeout_sec)
 
     resolved_sa = _resolve_sa_key(sa_key_file, sa_key_var)
-    cache_key = _build_key(endpoint, database, resolved_sa)
-
-    pool = _POOL_CACHE.get(cache_key)
-    if pool:
+    cache_key = _build_key(endpoint, database, ("sa_file", resolved_sa))
+    pool = _cache_hit(_POOL_CACHE, cache_key)
+    if pool is not None:
         return pool
+    creds = ydb.iam.ServiceAccountCredentials.from_file(resolved_sa)
+    return _get_or_create_pool(cache_key, endpoint, database, creds, wait_timeout_sec)
+
 
+def invalidate(endpoint: str, database: str, *, credentials: Optional[Any] = None, sa_key_file: Optional[str] = None) -> None:
+    """
+    Closes and forgets the cached driver/pool for endpoint/database (e.g. after the key was rotated).
+    """
+    identity = credentials_identity(credentials) if credentials is not None else ("sa_file", sa_key_file or "")
     with _CACHE_LOCK:
-        pool = _POOL_CACHE.get(cache_key)
-        if pool:
-            return pool
-        driver = get_driver(endpoint, database, sa_key_file=resolved_sa, wait_timeout_sec=wait_timeout_sec)
-        pool = ydb.SessionPool(driver)
-        _POOL_CACHE[cache_key] = pool
-        return pool
+        cache_key = _build_key(endpoint, database, identity)
+        _WARMUPS.pop(cache_key, None)
+        _close_entry(cache_key)
+
+
+def close_all() -> None:
+    """Stops every cached pool and driver."""
+    with _CACHE_LOCK:
+        _WARMUPS.clear()
+        for cache_key in list(_DRIVER_CACHE.keys()):
+            _close_entry(cache_key)
+
+
+atexit.register(close_all)
+
+
+class WarmUp:
+    """
+    Readiness handle returned by ``warm_up``.
+
+    ``ready`` is True once the driver is connected, the sessions exist and the queries are
+    prepared; ``wait(timeout)`` lets a handler block on an in-flight warm-up.
+    """
+
+    def __init__(self) -> None:
+        self._done = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.sessions = 0
+        self.prepared = 0
+        self.elapsed_sec: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self._done.wait(timeout)
+        return self.ready
+
+
+def _query_text(query: Union[str, Any]) -> str:
+    if isinstance(query, str):
+        from .queries import get_query  # registry is optional for driver users
+        return get_query(query).text
+    return query.text
+
+
+def _run_warm_up(handle: WarmUp, cache_key: CacheKey, pool_factory, sessions: int, queries: Iterable[Union[str, Any]], timeout_sec: float) -> None:
+    started = time.monotonic()
+    try:
+        pool = pool_factory()
+        texts = [_query_text(q) for q in queries]
+        acquired = []
+        try:
+            # Hold all sessions at once, otherwise the pool hands back the same warm one
+            for _ in range(max(sessions, 0)):
+                session = pool.acquire(timeout=timeout_sec)
+                acquired.append(session)
+                for text in texts:
+                    session.prepare(text)
+                    handle.prepared += 1
+        finally:
+            for session in acquired:
+                pool.release(session)
+        handle.sessions = len(acquired)
+    except Exception as e:
+        handle.error = e
+        with _CACHE_LOCK:
+            # A failed warm-up must not stick: the next warm_up() call retries
+            if _WARMUPS.get(cache_key) is handle:
+                _WARMUPS.pop(cache_key, None)
+    finally:
+        handle.elapsed_sec = time.monotonic() - started
+        handle._done.set()
+
+
+def warm_up(
+    endpoint: str,
+    database: str,
+    *,
+    credentials: Optional[Any] = None,
+    sa_key_file: Optional[str] = None,
+    sa_key_var: Optional[str] = None,
+    sessions: int = 1,
+    queries: Iterable[Union[str, Any]] = (),
+    background: bool = True,
+    wait_timeout_sec: float = 5.0,
+) -> WarmUp:
+    """
+    Opt-in cold-start warm-up: connects the cached driver, pre-creates ``sessions`` sessions in the
+    cached pool and prepares ``queries`` (registry names or NamedQuery objects) on each of them.
+
+    Meant to be called at import time. With ``background=True`` the work runs in a daemon thread
+    and the returned handle reports readiness; calls for an already warming/warm pool return the
+    existing handle.
+    """
+    if credentials is not None:
+        cache_key = _build_key(endpoint, database, credentials_identity(credentials))
+    else:
+        cache_key = _build_key(endpoint, database, ("sa_file", _resolve_sa_key(sa_key_file, sa_key_var)))
+
+    with _CACHE_LOCK:
+        existing = _WARMUPS.get(cache_key)
+        if existing is not None:
+            return existing
+        handle = WarmUp()
+        _WARMUPS[cache_key] = handle
+
+    def pool_factory() -> ydb.SessionPool:
+        return get_session_pool(
+            endpoint, database,
+            credentials=credentials, sa_key_file=sa_key_file, sa_key_var=sa_key_var,
+            wait_timeout_sec=wait_timeout_sec,
+        )
+
+    args = (handle, cache_key, pool_factory, sessions, tuple(queries), wait_timeout_sec)
+    if background:
+        threading.Thread(target=_run_warm_up, args=args, name="ydb-warm-up", daemon=True).start()
+    else:
+        _run_warm_up(*args)
+    return handle
+
+
+def warm_up_from_env(
+    endpoint_var: str = "YDB_ENDPOINT",
+    database_var: str = "YDB_DATABASE",
+    *,
+    credentials: Optional[Any] = None,
+    sa_key_var: Optional[str] = "SA_KEY_FILE",
+    sessions: int = 1,
+    queries: Iterable[Union[str, Any]] = (),
+    background: bool = True,
+    wait_timeout_sec: float = 5.0,
+) -> WarmUp:
+    endpoint = _require_env(endpoint_var)
+    database = _require_env(database_var)
+    return warm_up(
+        endpoint, database,
+        credentials=credentials, sa_key_var=None if credentials is not None else sa_key_var,
+        sessions=sessions, queries=queries, background=background, wait_timeout_sec=wait_timeout_sec,
+    )
 
 
 def get_driver_from_env(
@@ -130,4 +388,10 @@ __all__ = (
     "get_session_pool",
     "get_driver_from_env",
     "get_session_pool_from_env",
-)
\ No newline at end of file
+    "credentials_identity",
+    "invalidate",
+    "close_all",
+    "WarmUp",
+    "warm_up",
+    "warm_up_from_env",
+)
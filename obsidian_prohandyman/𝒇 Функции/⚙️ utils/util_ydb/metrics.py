@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from ..util_log.logger import JsonLogger
+
+# Границы корзин гистограммы, мс (последняя корзина — всё, что больше)
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# YDB_QUERY_LOG: all — событие на каждый запрос, slow — только медленнее YDB_SLOW_QUERY_MS
+# и запросы с ретраями/ошибками, off — только гистограмма
+_LOG_MODE = os.getenv("YDB_QUERY_LOG", "all").lower()
+_SLOW_MS = float(os.getenv("YDB_SLOW_QUERY_MS", "100"))
+
+_LOGGER: JsonLogger = JsonLogger()
+_STATS_LOCK = threading.Lock()
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    errors: int = 0
+    rows: int = 0
+    retries: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    acquire_wait_ms: float = 0.0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(BUCKETS_MS) + 1))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "rows": self.rows,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "acquire_wait_ms": round(self.acquire_wait_ms, 2),
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {(f"le_{b}" if i < len(BUCKETS_MS) else "inf"): n
+                        for i, (b, n) in enumerate(zip(BUCKETS_MS + (None,), self.buckets)) if n},
+        }
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Верхняя граница корзины, в которую попадает квантиль q (None — больше последней границы)."""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else None
+        return None
+
+
+_STATS: Dict[str, QueryStats] = {}
+
+
+@dataclass
+class _Operation:
+    """Текущий вызов retry_operation: номер попытки и ожидание сессии видны запросам внутри."""
+    name: str
+    started: float
+    attempts: int = 0
+    acquire_wait_ms: float = 0.0
+
+
+_CURRENT_OP: contextvars.ContextVar[Optional[_Operation]] = contextvars.ContextVar("ydb_current_op", default=None)
+
+
+def set_query_logger(logger: JsonLogger) -> None:
+    """Логгер для событий ydb.query / ydb.operation (например, с correlation_id вызова)."""
+    global _LOGGER
+    _LOGGER = logger
+
+
+def tx_mode_name(tx) -> str:
+    mode = getattr(getattr(tx, "_tx_state", None), "tx_mode", None)
+    return getattr(mode, "name", None) or (type(mode).__name__ if mode is not None else "unknown")
+
+
+def _stats_for(name: str) -> QueryStats:
+    stats = _STATS.get(name)
+    if stats is None:
+        stats = _STATS.setdefault(name, QueryStats())
+    return stats
+
+
+def record_query(name: str, duration_ms: float, *, rows: int, tx_mode: str, error: Optional[BaseException] = None) -> None:
+    """Фиксирует выполнение именованного запроса: гистограмма + событие ydb.query в JsonLogger."""
+    op = _CURRENT_OP.get()
+    attempt = op.attempts if op is not None else 1
+    with _STATS_LOCK:
+        stats = _stats_for(name)
+        stats.count += 1
+        stats.rows += rows
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        stats.buckets[bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+        if error is not None:
+            stats.errors += 1
+
+    if _LOG_MODE == "off":
+        return
+    if _LOG_MODE == "slow" and duration_ms < _SLOW_MS and attempt == 1 and error is None:
+        return
+    fields: Dict[str, Any] = {"q": name, "ms": round(duration_ms, 2), "rows": rows, "tx": tx_mode}
+    if attempt > 1:
+        fields["attempt"] = attempt
+    if op is not None:
+        fields["op"] = op.name
+    if error is not None:
+        fields["error"] = type(error).__name__
+    _LOGGER.log("WARN" if error is not None else "INFO", "ydb.query", **fields)
+
+
+def _record_operation(op: _Operation, duration_ms: float, error: Optional[BaseException]) -> None:
+    retries = max(op.attempts - 1, 0)
+    with _STATS_LOCK:
+        stats = _stats_for(f"op:{op.name}")
+        stats.count += 1
+        stats.retries += retries
+        stats.total_ms += duration_ms
+        stats.max_ms = max(stats.max_ms, duration_ms)
+        stats.acquire_wait_ms += op.acquire_wait_ms
+        stats.buckets[bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+        if error is not None:
+            stats.errors += 1
+
+    if _LOG_MODE == "off":
+        return
+    if _LOG_MODE == "slow" and duration_ms < _SLOW_MS and not retries and error is None:
+        return
+    fields: Dict[str, Any] = {
+        "op": op.name, "ms": round(duration_ms, 2), "retries": retries,
+        "acquire_wait_ms": round(op.acquire_wait_ms, 2),
+    }
+    if error is not None:
+        fields["error"] = type(error).__name__
+    _LOGGER.log("WARN" if error is not None or retries else "INFO", "ydb.operation", **fields)
+
+
+def instrumented_callee(name: str, callee: Callable) -> tuple:
+    """
+    Оборачивает callee для pool.retry_operation_*: каждая попытка увеличивает счётчик,
+    время до первой попытки — ожидание сессии. Возвращает (operation, sync-обёртка, async-обёртка).
+    """
+    op = _Operation(name=name, started=time.perf_counter())
+
+    def on_attempt() -> contextvars.Token:
+        op.attempts += 1
+        if op.attempts == 1:
+            op.acquire_wait_ms = (time.perf_counter() - op.started) * 1000
+        return _CURRENT_OP.set(op)
+
+    def wrapped(session, *args, **kwargs):
+        token = on_attempt()
+        try:
+            return callee(session, *args, **kwargs)
+        finally:
+            _CURRENT_OP.reset(token)
+
+    async def wrapped_async(session, *args, **kwargs):
+        token = on_attempt()
+        try:
+            return await callee(session, *args, **kwargs)
+        finally:
+            _CURRENT_OP.reset(token)
+
+    return op, wrapped, wrapped_async
+
+
+def retry_operation(pool, callee, *args, op: Optional[str] = None, retry_settings=None, **kwargs):
+    """
+    pool.retry_operation_sync с инструментированием: число ретраев (BAD_SESSION, OVERLOADED, ...)
+    и ожидание сессии попадают в событие ydb.operation и в гистограмму под именем op:<op>.
+    """
+    operation, wrapped, _ = instrumented_callee(op or getattr(callee, "__name__", "operation"), callee)
+    error: Optional[BaseException] = None
+    try:
+        return pool.retry_operation_sync(wrapped, retry_settings, *args, **kwargs)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _record_operation(operation, (time.perf_counter() - operation.started) * 1000, error)
+
+
+async def retry_operation_async(pool, callee, *args, op: Optional[str] = None, retry_settings=None, **kwargs):
+    """Асинхронный вариант retry_operation для ydb.aio.SessionPool."""
+    operation, _, wrapped_async = instrumented_callee(op or getattr(callee, "__name__", "operation"), callee)
+    error: Optional[BaseException] = None
+    try:
+        # retry_settings у ydb.aio.SessionPool.retry_operation — только именованный, позиционный ушел бы в callee
+        return await pool.retry_operation(wrapped_async, *args, retry_settings=retry_settings, **kwargs)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _record_operation(operation, (time.perf_counter() - operation.started) * 1000, error)
+
+
+def dump_query_stats(reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Снимок гистограммы: {имя запроса или op:<операция>: статистика}."""
+    with _STATS_LOCK:
+        snapshot = {name: stats.as_dict() for name, stats in sorted(_STATS.items())}
+        if reset:
+            _STATS.clear()
+    return snapshot
+
+
+def log_query_stats(logger: Optional[JsonLogger] = None, reset: bool = True) -> None:
+    """Пишет гистограмму одним событием ydb.query_stats (обычно в конце вызова функции)."""
+    snapshot = dump_query_stats(reset=reset)
+    if snapshot:
+        (logger or _LOGGER).info("ydb.query_stats", stats=snapshot)
+
+
+__all__ = (
+    "BUCKETS_MS",
+    "QueryStats",
+    "set_query_logger",
+    "record_query",
+    "retry_operation",
+    "retry_operation_async",
+    "dump_query_stats",
+    "log_query_stats",
+)
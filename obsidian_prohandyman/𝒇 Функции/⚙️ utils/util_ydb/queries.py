@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import ydb
+
+from .metrics import record_query, retry_operation, tx_mode_name
+
+# Схема параметров: имя -> YQL-тип строкой ("Utf8", "List<Utf8>", "Timestamp?") или объект типа ydb
+ParamSchema = Mapping[str, Union[str, Any]]
+
+_PRIMITIVE_NAMES = (
+    "Bool", "Int8", "Uint8", "Int16", "Uint16", "Int32", "Uint32", "Int64", "Uint64",
+    "Float", "Double", "String", "Utf8", "Json", "JsonDocument", "Yson", "Uuid",
+    "Date", "Datetime", "Timestamp", "Interval",
+)
+_PRIMITIVES = {n: getattr(ydb.PrimitiveType, n) for n in _PRIMITIVE_NAMES if hasattr(ydb.PrimitiveType, n)}
+
+_REGISTRY: Dict[str, "NamedQuery"] = {}
+_REGISTRY_LOCK = threading.Lock()
+# Отрендеренные шаблоны (например, notices_<user_id>) — ограниченный LRU
+_RENDERED: "OrderedDict[Tuple[str, Tuple[Tuple[str, str], ...]], NamedQuery]" = OrderedDict()
+_RENDERED_MAX = 256
+
+# keep_in_cache: сервер кеширует план по тексту, а SDK после первого выполнения запоминает
+# query_id в сессии — повторные вызовы в той же сессии идут по id без отдельного prepare.
+KEEP_IN_CACHE = ydb.ExecDataQuerySettings().with_keep_in_cache(True)
+
+
+def _split_top_level(s: str) -> List[str]:
+    """Делит 'a:Utf8,b:List<Struct<x:Int64,y:Utf8>>' по запятым верхнего уровня."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(s):
+        if ch == "<":
+            depth += 1
+        elif ch == ">":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(s[start:i])
+            start = i + 1
+    parts.append(s[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_type(spec: Union[str, Any]) -> Any:
+    """
+    'Utf8' / 'List<Utf8>' / 'Optional<Timestamp>' / 'Utf8?' / 'Struct<id:Utf8,n:Int64?>' -> тип ydb.
+    Объекты типов возвращаются как есть.
+    """
+    if not isinstance(spec, str):
+        return spec
+    s = spec.strip()
+    if s.endswith("?"):
+        return ydb.OptionalType(parse_type(s[:-1]))
+    if s.startswith("Optional<") and s.endswith(">"):
+        return ydb.OptionalType(parse_type(s[len("Optional<"):-1]))
+    if s.startswith("List<") and s.endswith(">"):
+        return ydb.ListType(parse_type(s[len("List<"):-1]))
+    if s.startswith("Struct<") and s.endswith(">"):
+        struct = ydb.StructType()
+        for member in _split_top_level(s[len("Struct<"):-1]):
+            name, sep, member_type = member.partition(":")
+            if not sep:
+                raise ValueError(f"Struct member without type in '{spec}'")
+            struct.add_member(name.strip(), parse_type(member_type))
+        return struct
+    try:
+        return _PRIMITIVES[s]
+    except KeyError:
+        raise ValueError(f"Unsupported YQL type in query schema: '{spec}'")
+
+
+def normalize_yql(text: str) -> str:
+    """Убирает отступы, пустые строки и строчные комментарии '--': один запрос — один текст."""
+    lines = []
+    for raw in text.strip().splitlines():
+        line = raw.strip()
+        if line and not line.startswith("--"):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _param_name(name: str) -> str:
+    return name if name.startswith("$") else f"${name}"
+
+
+def _schema(params: Optional[ParamSchema]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((_param_name(p), t if isinstance(t, str) else str(t)) for p, t in (params or {}).items())
+
+
+@dataclass(frozen=True)
+class NamedQuery:
+    name: str
+    text: str
+    params: Tuple[Tuple[str, str], ...]
+    data_query: Any = None          # None у шаблонов: DataQuery строится при рендере
+    path_prefix: Optional[str] = None
+
+    @property
+    def is_template(self) -> bool:
+        return self.data_query is None
+
+    def bind(self, values: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+        """Проверяет параметры по схеме; ключи можно передавать с '$' или без."""
+        bound = {_param_name(k): v for k, v in (values or {}).items()}
+        expected = {p for p, _ in self.params}
+        missing = expected - bound.keys()
+        extra = bound.keys() - expected
+        if missing or extra:
+            raise ValueError(f"Query '{self.name}': missing params {sorted(missing)}, unexpected params {sorted(extra)}")
+        return bound
+
+
+def _build(name: str, body: str, schema: Tuple[Tuple[str, str], ...], path_prefix: Optional[str]) -> NamedQuery:
+    if "DECLARE " in body.upper():
+        raise ValueError(f"Query '{name}': DECLARE is generated from the params schema, remove it from the text")
+    header = [f"PRAGMA TablePathPrefix('{path_prefix}');"] if path_prefix else []
+    header += [f"DECLARE {p} AS {t};" for p, t in schema]
+    text = "\n".join(header + [body])
+    data_query = ydb.DataQuery(text, {p: parse_type(t) for p, t in schema})
+    return NamedQuery(name=name, text=text, params=schema, data_query=data_query, path_prefix=path_prefix)
+
+
+def register_query(
+    name: str,
+    text: str,
+    params: Optional[ParamSchema] = None,
+    *,
+    path_prefix: Optional[str] = None,
+    template: bool = False,
+) -> NamedQuery:
+    """
+    Объявляет запрос один раз (обычно на уровне модуля функции).
+    DECLARE генерируются из params, PRAGMA TablePathPrefix — из path_prefix (если нужен).
+    template=True: текст содержит плейсхолдеры str.format (например, {table}), см. execute_named(fmt=...).
+    Повторная регистрация с тем же текстом безопасна; с другим — ошибка.
+    """
+    body, schema = normalize_yql(text), _schema(params)
+    if template:
+        query = NamedQuery(name=name, text=body, params=schema, path_prefix=path_prefix)
+    else:
+        query = _build(name, body, schema, path_prefix)
+    with _REGISTRY_LOCK:
+        existing = _REGISTRY.get(name)
+        if existing is not None:
+            if existing.text != query.text:
+                raise ValueError(f"Query '{name}' is already registered with a different text")
+            return existing
+        _REGISTRY[name] = query
+        return query
+
+
+def get_query(name: str, fmt: Optional[Mapping[str, str]] = None) -> NamedQuery:
+    """Зарегистрированный запрос; для шаблона — отрендеренный по fmt (с LRU-кешем)."""
+    try:
+        query = _REGISTRY[name]
+    except KeyError:
+        raise KeyError(f"Query '{name}' is not registered")
+    if not query.is_template:
+        if fmt:
+            raise ValueError(f"Query '{name}' is not a template")
+        return query
+    if not fmt:
+        raise ValueError(f"Query '{name}' is a template and requires fmt")
+
+    cache_key = (name, tuple(sorted(fmt.items())))
+    with _REGISTRY_LOCK:
+        rendered = _RENDERED.get(cache_key)
+        if rendered is not None:
+            _RENDERED.move_to_end(cache_key)
+            return rendered
+    rendered = _build(name, query.text.format(**fmt), query.params, query.path_prefix)
+    with _REGISTRY_LOCK:
+        _RENDERED[cache_key] = rendered
+        while len(_RENDERED) > _RENDERED_MAX:
+            _RENDERED.popitem(last=False)
+    return rendered
+
+
+def execute_named(
+    tx,
+    name: str,
+    params: Optional[Mapping[str, Any]] = None,
+    *,
+    commit_tx: bool = False,
+    fmt: Optional[Mapping[str, str]] = None,
+):
+    """
+    Выполняет зарегистрированный запрос в транзакции tx (session.transaction(...)) с keep_in_cache.
+    Длительность, число строк и режим транзакции пишутся в metrics (событие ydb.query + гистограмма).
+    Возвращает result sets, как tx.execute.
+    """
+    query = get_query(name, fmt)
+    bound = query.bind(params)
+    started = time.perf_counter()
+    try:
+        result_sets = tx.execute(query.data_query, bound, commit_tx=commit_tx, settings=KEEP_IN_CACHE)
+    except Exception as e:
+        record_query(name, (time.perf_counter() - started) * 1000, rows=0, tx_mode=tx_mode_name(tx), error=e)
+        raise
+    record_query(name, (time.perf_counter() - started) * 1000, rows=sum(len(rs.rows) for rs in result_sets), tx_mode=tx_mode_name(tx))
+    return result_sets
+
+
+# ---------- ЧТЕНИЕ БЕЗ SerializableReadWrite ----------
+
+# online — OnlineReadOnly: согласованное чтение с лидеров шардов, без блокировок
+# online_inconsistent — то же, но без согласованности между шардами (дешевле)
+# stale — StaleReadOnly: допускает отставание на доли секунды, можно читать с реплик
+# snapshot — SnapshotReadOnly: согласованный снимок (для нескольких SELECT в одном запросе)
+_CONSISTENCY: Dict[str, Callable[[], Any]] = {
+    "online": lambda: ydb.OnlineReadOnly(),
+    "online_inconsistent": lambda: ydb.OnlineReadOnly().with_allow_inconsistent_reads(),
+    "stale": lambda: ydb.StaleReadOnly(),
+    "snapshot": lambda: ydb.SnapshotReadOnly(),
+}
+
+
+def _tx_mode(consistency: Union[str, Any]) -> Any:
+    if not isinstance(consistency, str):
+        return consistency
+    try:
+        return _CONSISTENCY[consistency]()
+    except KeyError:
+        raise ValueError(f"Unknown read consistency '{consistency}', expected one of {sorted(_CONSISTENCY)}")
+
+
+def rows_to_dicts(result_set) -> List[Dict[str, Any]]:
+    """Строки result set -> список dict по именам колонок."""
+    names = [c.name for c in result_set.columns]
+    return [{n: row[n] for n in names} for row in result_set.rows]
+
+
+def read_sets(
+    target,
+    name: str,
+    params: Optional[Mapping[str, Any]] = None,
+    *,
+    consistency: Union[str, Any] = "online",
+    fmt: Optional[Mapping[str, str]] = None,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Однократное чтение: read-only транзакция, execute с commit_tx=True (один round-trip, без блокировок).
+    target — SessionPool (выполнение через retry_operation_sync) или уже полученная сессия.
+    Возвращает все result sets запроса списками dict.
+    """
+    def run(session) -> List[List[Dict[str, Any]]]:
+        tx = session.transaction(_tx_mode(consistency))
+        return [rows_to_dicts(rs) for rs in execute_named(tx, name, params, commit_tx=True, fmt=fmt)]
+
+    if hasattr(target, "retry_operation_sync"):
+        return retry_operation(target, run, op=name)
+    return run(target)
+
+
+def read_many(target, name: str, params: Optional[Mapping[str, Any]] = None, *, consistency: Union[str, Any] = "online", fmt: Optional[Mapping[str, str]] = None) -> List[Dict[str, Any]]:
+    """Строки первого result set (см. read_sets)."""
+    return read_sets(target, name, params, consistency=consistency, fmt=fmt)[0]
+
+
+def read_one(target, name: str, params: Optional[Mapping[str, Any]] = None, *, consistency: Union[str, Any] = "online", fmt: Optional[Mapping[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """Первая строка первого result set или None."""
+    rows = read_many(target, name, params, consistency=consistency, fmt=fmt)
+    return rows[0] if rows else None
+
+
+def registered_queries() -> Tuple[NamedQuery, ...]:
+    """Все нешаблонные запросы реестра (например, для прогрева сессий)."""
+    with _REGISTRY_LOCK:
+        return tuple(q for q in _REGISTRY.values() if not q.is_template)
+
+
+__all__ = (
+    "NamedQuery",
+    "parse_type",
+    "normalize_yql",
+    "register_query",
+    "get_query",
+    "execute_named",
+    "registered_queries",
+    "rows_to_dicts",
+    "read_sets",
+    "read_many",
+    "read_one",
+    "KEEP_IN_CACHE",
+)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import ydb
+
+from .driver import WarmUp, get_driver, get_session_pool, warm_up
+
+# Логическое имя базы -> (переменные endpoint, переменные database) в порядке приоритета.
+# Базы проекта живут на одном serverless-эндпоинте, поэтому endpoint по умолчанию берется из YDB_ENDPOINT.
+DEFAULT_TOPOLOGY: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "auth": (("YDB_ENDPOINT",), ("YDB_DATABASE",)),
+    "firms": (("YDB_ENDPOINT_FIRMS", "YDB_ENDPOINT"), ("YDB_DATABASE_FIRMS",)),
+    "tariffs": (
+        ("YDB_ENDPOINT_TARIFFS", "YDB_ENDPOINT_TARIFFS_AND_STORAGE", "YDB_ENDPOINT"),
+        ("YDB_DATABASE_TARIFFS", "YDB_DATABASE_TARIFFS_AND_STORAGE"),
+    ),
+    "notices": (("YDB_ENDPOINT_NOTICES", "YDB_ENDPOINT"), ("YDB_DATABASE_NOTICES",)),
+    "meta": (("YDB_ENDPOINT_META", "YDB_ENDPOINT"), ("YDB_DATABASE_META", "YDB_DATABASE")),
+    "endpoints": (("YDB_ENDPOINT_ENDPOINTS", "YDB_ENDPOINT"), ("YDB_DATABASE_ENDPOINTS",)),
+    "invitations": (("YDB_ENDPOINT_INVITATIONS", "YDB_ENDPOINT"), ("YDB_DATABASE_INVITATIONS",)),
+}
+
+# YDB_TOPOLOGY — JSON с явной топологией поверх переменных: {"firms": {"endpoint": "...", "database": "..."}}
+TOPOLOGY_VAR = "YDB_TOPOLOGY"
+
+
+@dataclass(frozen=True)
+class DatabaseTarget:
+    name: str
+    endpoint: str
+    database: str
+
+
+def _first_env(env: Mapping[str, str], names: Iterable[str]) -> Optional[str]:
+    for name in names:
+        value = env.get(name)
+        if value:
+            return value
+    return None
+
+
+def topology_from_env(environ: Optional[Mapping[str, str]] = None) -> Dict[str, DatabaseTarget]:
+    """
+    Читает топологию из окружения: все логические базы, для которых заданы endpoint и database.
+    Ненастроенные имена пропускаются (ошибка будет при обращении к ним).
+    """
+    env = os.environ if environ is None else environ
+    targets: Dict[str, DatabaseTarget] = {}
+    for name, (endpoint_vars, database_vars) in DEFAULT_TOPOLOGY.items():
+        endpoint = _first_env(env, endpoint_vars)
+        database = _first_env(env, database_vars)
+        if endpoint and database:
+            targets[name] = DatabaseTarget(name, endpoint, database)
+
+    raw = env.get(TOPOLOGY_VAR)
+    if raw:
+        for name, spec in json.loads(raw).items():
+            previous = targets.get(name)
+            endpoint = spec.get("endpoint") or (previous.endpoint if previous else env.get("YDB_ENDPOINT"))
+            database = spec.get("database") or (previous.database if previous else None)
+            if not endpoint or not database:
+                raise RuntimeError(f"{TOPOLOGY_VAR}: database '{name}' needs both endpoint and database")
+            targets[name] = DatabaseTarget(name, endpoint, database)
+    return targets
+
+
+class DatabaseRouter:
+    """
+    Пулы YDB по логическому имени базы (auth, firms, tariffs, notices, meta, ...).
+
+    Топология читается один раз. Имена, указывающие на одну и ту же базу, делят драйвер и пул;
+    все драйверы делят один объект креденшелов (один IAM-токен на процесс). Драйверы и пулы
+    берутся из общего кеша driver.py, так что хендлеры без роутера переиспользуют те же подключения.
+    """
+
+    def __init__(
+        self,
+        topology: Mapping[str, Union[DatabaseTarget, Tuple[str, str]]],
+        *,
+        credentials: Union[Any, Callable[[], Any], None] = None,
+        wait_timeout_sec: float = 5.0,
+    ) -> None:
+        self._targets: Dict[str, DatabaseTarget] = {
+            name: t if isinstance(t, DatabaseTarget) else DatabaseTarget(name, t[0], t[1])
+            for name, t in topology.items()
+        }
+        self._credentials_source = credentials
+        self._credentials: Any = None
+        self._lock = threading.Lock()
+        self.wait_timeout_sec = wait_timeout_sec
+
+    @classmethod
+    def from_env(
+        cls,
+        *,
+        credentials: Union[Any, Callable[[], Any], None] = None,
+        wait_timeout_sec: float = 5.0,
+        environ: Optional[Mapping[str, str]] = None,
+    ) -> "DatabaseRouter":
+        return cls(topology_from_env(environ), credentials=credentials, wait_timeout_sec=wait_timeout_sec)
+
+    # --------- ТОПОЛОГИЯ ---------
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return tuple(self._targets)
+
+    def target(self, name: str) -> DatabaseTarget:
+        try:
+            return self._targets[name]
+        except KeyError:
+            hint = ""
+            if name in DEFAULT_TOPOLOGY:
+                endpoint_vars, database_vars = DEFAULT_TOPOLOGY[name]
+                hint = f": set {database_vars[0]} (and {endpoint_vars[0]} if it differs from YDB_ENDPOINT)"
+            raise RuntimeError(f"Database '{name}' is not configured{hint}")
+
+    def has(self, name: str) -> bool:
+        return name in self._targets
+
+    def database(self, name: str) -> str:
+        """Путь базы (например, для PRAGMA TablePathPrefix)."""
+        return self.target(name).database
+
+    def endpoints(self) -> Dict[str, Tuple[str, ...]]:
+        """endpoint -> базы на нем (для диагностики топологии)."""
+        grouped: Dict[str, list] = {}
+        for t in self._targets.values():
+            databases = grouped.setdefault(t.endpoint, [])
+            if t.database not in databases:
+                databases.append(t.database)
+        return {endpoint: tuple(dbs) for endpoint, dbs in grouped.items()}
+
+    # --------- ПОДКЛЮЧЕНИЯ ---------
+
+    @property
+    def credentials(self) -> Any:
+        """Креденшелы всех баз роутера; по умолчанию ydb_creds_from_env(), вычисляются при первом обращении."""
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    source = self._credentials_source
+                    if source is None:
+                        from .credentials import ydb_creds_from_env
+                        source = ydb_creds_from_env
+                    self._credentials = source() if callable(source) else source
+        return self._credentials
+
+    def pool(self, name: str) -> ydb.SessionPool:
+        t = self.target(name)
+        return get_session_pool(t.endpoint, t.database, credentials=self.credentials, wait_timeout_sec=self.wait_timeout_sec)
+
+    def driver(self, name: str) -> ydb.Driver:
+        t = self.target(name)
+        return get_driver(t.endpoint, t.database, credentials=self.credentials, wait_timeout_sec=self.wait_timeout_sec)
+
+    async def async_pool(self, name: str):
+        """ydb.aio.SessionPool для имени (вызывать внутри фонового loop aio.py)."""
+        from .aio import get_async_pool  # ydb.aio нужен только асинхронным хендлерам
+        t = self.target(name)
+        return await get_async_pool(t.endpoint, t.database, credentials=self.credentials, wait_timeout_sec=self.wait_timeout_sec)
+
+    def connect(self, *names: str) -> Dict[str, ydb.SessionPool]:
+        """
+        Пулы для нескольких имен сразу. Рукопожатия (discovery, driver.wait) с разными базами
+        идут параллельно — холодный старт мультибазовой функции стоит одно подключение, а не сумму.
+        """
+        names = names or self.names
+        distinct: Dict[Tuple[str, str], str] = {}
+        for name in names:
+            t = self.target(name)
+            distinct.setdefault((t.endpoint, t.database), name)
+        self.credentials  # один раз и до потоков
+        if len(distinct) > 1:
+            with ThreadPoolExecutor(max_workers=len(distinct), thread_name_prefix="ydb-connect") as executor:
+                list(executor.map(self.pool, distinct.values()))
+        return {name: self.pool(name) for name in names}
+
+    def warm_up(self, name: str, *, sessions: int = 1, queries: Iterable[Union[str, Any]] = (), background: bool = True) -> WarmUp:
+        """driver.warm_up для логической базы."""
+        t = self.target(name)
+        return warm_up(
+            t.endpoint, t.database,
+            credentials=self.credentials, sessions=sessions, queries=queries,
+            background=background, wait_timeout_sec=self.wait_timeout_sec,
+        )
+
+
+_ROUTER: Optional[DatabaseRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router(*, credentials: Union[Any, Callable[[], Any], None] = None) -> DatabaseRouter:
+    """
+    Роутер процесса с топологией из окружения (создается при первом вызове).
+    credentials учитываются только при создании — функция с креденшелами из Lockbox
+    передает сюда ydb_creds_from_lockbox_env.
+    """
+    global _ROUTER
+    if _ROUTER is None:
+        with _ROUTER_LOCK:
+            if _ROUTER is None:
+                _ROUTER = DatabaseRouter.from_env(credentials=credentials)
+    return _ROUTER
+
+
+def reset_router() -> None:
+    """Забывает роутер процесса (подключения остаются в кеше driver.py)."""
+    global _ROUTER
+    with _ROUTER_LOCK:
+        _ROUTER = None
+
+
+__all__ = (
+    "DEFAULT_TOPOLOGY",
+    "DatabaseTarget",
+    "DatabaseRouter",
+    "topology_from_env",
+    "get_router",
+    "reset_router",
+)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from ..util_cache.ttl_cache import TTLCache
+from ..util_log.logger import JsonLogger
+
+
+class WriteBehindBuffer:
+    """
+    Отложенная запись некритичных колонок (last_login_at и т.п.) мимо горячего пути запроса.
+    Строки копятся в памяти инстанса по ключу (последняя побеждает) и уходят одной пачкой в фоновом потоке:
+    по интервалу flush_interval_sec от первой строки пачки или сразу при max_pending строк.
+    Ключ, записанный за последние coalesce_sec, повторно не ставится — не больше одной записи на ключ за окно,
+    поэтому серия повторов одного пользователя не создает конкурирующих транзакций на его строке.
+
+    Запись best-effort: при остановке инстанса теряется не больше flush_interval_sec последних значений,
+    неудачная пачка возвращается в буфер (если ключ не перезаписан новым значением).
+    Для данных, которые нельзя терять или которые читаются сразу после записи, не подходит.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Dict[str, Any]]], Any],
+        *,
+        key: str,
+        flush_interval_sec: float = 60.0,
+        coalesce_sec: float = 60.0,
+        max_pending: int = 1000,
+        logger: Optional[JsonLogger] = None,
+        name: str = "write_behind",
+    ) -> None:
+        self._flush = flush
+        self._key = key
+        self.flush_interval_sec = flush_interval_sec
+        self.max_pending = max_pending
+        self.name = name
+        self._logger = logger or JsonLogger()
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        # Ключи, ушедшие в запись за последние coalesce_sec
+        self._written: TTLCache = TTLCache(max(max_pending * 10, 1000), coalesce_sec)
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.flushed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def add(self, row: Mapping[str, Any]) -> bool:
+        """Ставит строку в буфер. False — ключ уже записан в окне coalesce_sec, строка отброшена."""
+        key = row[self._key]
+        with self._lock:
+            if key not in self._pending and self._written.get(key) is not None:
+                self.coalesced += 1
+                return False
+            self._pending[key] = dict(row)
+            full = len(self._pending) >= self.max_pending
+            if not full:
+                self._arm_timer_locked()
+        if full:
+            self.flush_async()
+        return True
+
+    def flush_async(self) -> Optional[Future]:
+        """Отправляет накопленное в фоновый поток. Возвращает Future записи или None, если буфер пуст."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return None
+            batch, self._pending = list(self._pending.values()), {}
+            for row in batch:
+                self._written.set(row[self._key], True)
+            if self._executor is None:
+                # Один поток — пачки пишутся по очереди и не конкурируют друг с другом
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.name)
+            executor = self._executor
+        return executor.submit(self._write, batch)
+
+    def flush(self, timeout: Optional[float] = None) -> int:
+        """Синхронная запись накопленного (завершение работы, отладка). Возвращает число строк пачки."""
+        future = self.flush_async()
+        return future.result(timeout) if future is not None else 0
+
+    def _write(self, batch: List[Dict[str, Any]]) -> int:
+        started = time.perf_counter()
+        try:
+            self._flush(batch)
+        except Exception as e:
+            requeued = self._requeue(batch)
+            self._logger.warn(f"{self.name}.flush_failed", rows=len(batch), requeued=requeued, error=str(e))
+            return 0
+        self.flushed += len(batch)
+        self._logger.info(f"{self.name}.flushed", rows=len(batch), ms=round((time.perf_counter() - started) * 1000, 2))
+        return len(batch)
+
+    def _requeue(self, batch: List[Dict[str, Any]]) -> int:
+        requeued = 0
+        with self._lock:
+            for row in batch:
+                key = row[self._key]
+                self._written.pop(key)
+                # Более новое значение ключа уже в буфере — старое не возвращаем
+                if key in self._pending:
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    self.dropped += 1
+                    continue
+                self._pending[key] = row
+                requeued += 1
+            if self._pending:
+                self._arm_timer_locked()
+        return requeued
+
+    def _arm_timer_locked(self) -> None:
+        # Первая строка пачки — пачка уйдет не позже чем через flush_interval_sec (таймер один на пачку)
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval_sec, self.flush_async)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._pending), "flushed": self.flushed, "coalesced": self.coalesced, "dropped": self.dropped}
+
+
+__all__ = ("WriteBehindBuffer",)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сопоставления маршрутов auth-gate: линейный проход с fnmatch против CompiledPolicy (policy_matcher.py).
+
+Генерирует тысячи синтетических правил в стиле access_policy.json, сверяет, что оба способа
+выбирают одно и то же правило на каждом запросе, и печатает время на запрос.
+
+    python bench_auth_gate_policy.py --rules 5000 --requests 20000
+"""
+import argparse
+import random
+import re
+import time
+import types
+from pathlib import Path
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "obsidian_prohandyman" / "𝒇 Функции"
+MATCHER_MD = (
+    FUNCTIONS_DIR / "renzikov_hub functions" / "🛡️ auth-gate - CloudFunction функция"
+    / "Python код - 🛡️ auth-gate - CloudFunction функция" / "policy_matcher.py  - 🛡️ auth-gate - CloudFunction функция.md"
+)
+
+RESOURCES = ["employees", "clients", "tasks", "documents", "integrations", "tariffs", "storage", "notices"]
+ACTIONS = ["invite", "edit", "delete", "list", "get", "upload", "download", "archive"]
+METHODS = ["GET", "POST", "PUT", "DELETE", "*"]
+
+
+def load_matcher() -> types.ModuleType:
+    """Извлекает код из md так же, как zip_cloud_function.py, и загружает его модулем."""
+    content = MATCHER_MD.read_text(encoding="utf-8")
+    code = "\n".join(re.findall(r"```python\n(.*?)\n```", content, re.DOTALL))
+    module = types.ModuleType("policy_matcher")
+    exec(compile(code, str(MATCHER_MD), "exec"), module.__dict__)
+    return module
+
+
+def synthetic_policy(n_rules: int, rnd: random.Random) -> dict:
+    rules = []
+    for i in range(n_rules):
+        resource = rnd.choice(RESOURCES)
+        action = rnd.choice(ACTIONS)
+        kind = rnd.random()
+        if kind < 0.6:
+            path = f"/firms/*/{resource}{i}/{action}"           # сегментный wildcard
+        elif kind < 0.8:
+            path = f"/v{i % 7}/{resource}/{action}{i}"          # чистый литерал
+        elif kind < 0.95:
+            path = f"/firms/*/{resource}{i}/*"                  # хвостовой wildcard
+        else:
+            path = f"/firms/*/{resource}{i}/{action}-*"         # частичный glob в сегменте
+        rule = {"path": path, "method": rnd.choice(METHODS), "allowed_roles_any": ["OWNER"]}
+        if rnd.random() < 0.1:
+            rule["host"] = f"api{i % 3}.example.com"
+        else:
+            rule["host"] = "*"
+        rules.append(rule)
+    return {"default": {"allow_if_not_listed": True}, "rules": rules}
+
+
+def synthetic_requests(n_requests: int, n_rules: int, rnd: random.Random) -> list:
+    requests = []
+    for _ in range(n_requests):
+        i = rnd.randrange(n_rules)
+        resource = rnd.choice(RESOURCES)
+        action = rnd.choice(ACTIONS)
+        kind = rnd.random()
+        if kind < 0.4:
+            path = f"/firms/f{rnd.randrange(1000)}/{resource}{i}/{action}"
+        elif kind < 0.55:
+            path = f"/firms/a/b/{resource}{i}/{action}"          # '*' fnmatch захватывает несколько сегментов
+        elif kind < 0.7:
+            path = f"/v{i % 7}/{resource}/{action}{i}"
+        elif kind < 0.8:
+            path = f"/firms/f1/{resource}{i}/{action}-x/y"
+        else:
+            path = f"/unlisted/{resource}/{i}"                   # промах — худший случай для линейного прохода
+        host = rnd.choice(["api0.example.com", "api1.example.com", "other.example.com"])
+        requests.append((host, path, rnd.choice(METHODS[:-1])))
+    return requests
+
+
+def bench(label: str, fn, requests: list) -> float:
+    started = time.perf_counter()
+    for host, path, method in requests:
+        fn(host, path, method)
+    per_request_us = (time.perf_counter() - started) / len(requests) * 1e6
+    print(f"  {label:<10} {per_request_us:10.2f} мкс/запрос")
+    return per_request_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 1000, 5000])
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    matcher = load_matcher()
+    for n_rules in args.rules:
+        rnd = random.Random(args.seed)
+        policy = synthetic_policy(n_rules, rnd)
+        requests = synthetic_requests(args.requests, n_rules, rnd)
+
+        started = time.perf_counter()
+        compiled = matcher.CompiledPolicy(policy)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        mismatches = 0
+        for host, path, method in requests:
+            if compiled.match(host, path, method) is not matcher.match_linear(policy, host, path, method):
+                mismatches += 1
+
+        print(f"\nПравил: {n_rules}, запросов: {len(requests)}, компиляция: {compile_ms:.1f} мс, {compiled.stats()}")
+        linear = bench("linear", lambda h, p, m: matcher.match_linear(policy, h, p, m), requests)
+        fast = bench("compiled", compiled.match, requests)
+        print(f"  ускорение: x{linear / fast:.1f}, расхождений с fnmatch: {mismatches}")
+        if mismatches:
+            raise SystemExit("CompiledPolicy разошелся с линейным fnmatch")
+
+
+if __name__ == "__main__":
+    main()
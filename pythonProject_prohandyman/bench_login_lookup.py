@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска пользователя при входе: WHERE email = $email OR phone_number = $phone против
+чтений вторичных индексов email_idx / phone_idx (utils/util_auth/user_lookup.py — те же тексты, что у login).
+
+Заполняет локальную YDB (docker ydbplatform/local-ydb) таблицей users нужного размера через BulkUpsert,
+строит индексы так же, как миграция jwt-database (ALTER TABLE ... ADD INDEX на заполненной таблице),
+и печатает задержку запросов на случайных существующих и отсутствующих пользователях.
+
+    python bench_login_lookup.py --users 1000000 --lookups 200
+    python bench_login_lookup.py --skip-seed          # таблица уже заполнена прошлым запуском
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import types
+import uuid
+from pathlib import Path
+
+import ydb
+
+UTILS_DIR = Path(__file__).resolve().parent.parent / "obsidian_prohandyman" / "𝒇 Функции" / "⚙️ utils"
+
+COLUMNS = "user_id, password_hash, is_active, jwt_token, email, phone_number"
+COLUMN_TYPES = {
+    "user_id": "Utf8",
+    "email": "Utf8",
+    "password_hash": "Utf8",
+    "is_active": "Bool",
+    "phone_number": "Utf8?",
+    "jwt_token": "Utf8?",
+}
+
+
+def load_utils() -> types.ModuleType:
+    """Пакет utils из «⚙️ utils» под именем utils, без исполнения его __init__ (там зависимости функций)."""
+    package = types.ModuleType("utils")
+    package.__path__ = [str(UTILS_DIR)]
+    sys.modules["utils"] = package
+    import utils.util_auth.user_lookup  # noqa: F401
+    import utils.util_ydb.bulk  # noqa: F401
+    return package
+
+
+def create_table(pool: ydb.SessionPool, table_path: str) -> None:
+    def create(session):
+        session.execute_scheme(f"""
+            CREATE TABLE `{table_path}` (
+                user_id Utf8,
+                email Utf8,
+                password_hash Utf8,
+                is_active Bool,
+                phone_number Utf8,
+                jwt_token Utf8,
+                PRIMARY KEY (user_id)
+            );
+        """)
+    pool.retry_operation_sync(create)
+
+
+def add_indexes(pool: ydb.SessionPool, table_path: str, email_index: str, phone_index: str) -> None:
+    """Как Up-миграция: индексы строятся на уже заполненной таблице."""
+    def alter(session):
+        session.execute_scheme(f"ALTER TABLE `{table_path}` ADD INDEX {email_index} GLOBAL ON (email);")
+        session.execute_scheme(f"ALTER TABLE `{table_path}` ADD INDEX {phone_index} GLOBAL ON (phone_number);")
+    pool.retry_operation_sync(alter)
+
+
+def user_row(i: int) -> dict:
+    return {
+        "user_id": str(uuid.UUID(int=i + 1)),
+        "email": f"user{i}@bench.example.com",
+        "password_hash": "$2b$12$" + "x" * 53,
+        "is_active": True,
+        "phone_number": f"79{i:09d}",
+        "jwt_token": None,
+    }
+
+
+def seed(utils, driver: ydb.Driver, table_path: str, n_users: int) -> None:
+    started = time.perf_counter()
+    rows = (user_row(i) for i in range(n_users))
+    written = utils.util_ydb.bulk.bulk_upsert(driver, table_path, rows, COLUMN_TYPES)
+    print(f"Записано {written} пользователей за {time.perf_counter() - started:.1f} с")
+
+
+def bench(utils, pool: ydb.SessionPool, label: str, name: str, params_list: list) -> float:
+    execute_named = utils.util_ydb.queries.execute_named
+
+    def run(session, params):
+        tx = session.transaction(ydb.OnlineReadOnly())
+        return execute_named(tx, name, params, commit_tx=True)
+
+    # Прогрев: план запроса в кеше сервера и сессии
+    pool.retry_operation_sync(run, None, params_list[0])
+    timings = []
+    for params in params_list:
+        started = time.perf_counter()
+        pool.retry_operation_sync(run, None, params)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"  {label:<22} p50 {p50:9.2f} мс   p95 {p95:9.2f} мс")
+    return p50
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", default="grpc://localhost:2136")
+    parser.add_argument("--database", default="/local")
+    parser.add_argument("--dir", default="bench_login_lookup", help="каталог таблицы users внутри базы")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    utils = load_utils()
+    user_lookup = utils.util_auth.user_lookup
+    path_prefix = f"{args.database.rstrip('/')}/{args.dir}"
+    table_path = f"{path_prefix}/users"
+
+    # Те же запросы, что у login; OR-вариант — прежний текст как точка сравнения
+    user_lookup.register_user_lookup("bench", COLUMNS, path_prefix=path_prefix)
+    utils.util_ydb.queries.register_query("bench.user_by_email_or_phone_scan", f"""
+        SELECT {COLUMNS}
+        FROM users
+        WHERE email = $email OR phone_number = $phone
+        LIMIT 1;
+    """, {"$email": "Utf8", "$phone": "Utf8"}, path_prefix=path_prefix)
+
+    driver = ydb.Driver(endpoint=args.endpoint, database=args.database, credentials=ydb.AnonymousCredentials())
+    driver.wait(timeout=10, fail_fast=True)
+    pool = ydb.SessionPool(driver, size=4)
+    try:
+        if not args.skip_seed:
+            driver.scheme_client.make_directory(path_prefix)
+            create_table(pool, table_path)
+            seed(utils, driver, table_path, args.users)
+            started = time.perf_counter()
+            add_indexes(pool, table_path, user_lookup.EMAIL_INDEX, user_lookup.PHONE_INDEX)
+            print(f"Индексы построены за {time.perf_counter() - started:.1f} с")
+
+        rnd = random.Random(args.seed)
+        picks = [rnd.randrange(args.users) for _ in range(args.lookups)]
+        # Четверть обращений — несуществующий пользователь: для OR это полный проход без раннего выхода
+        found = [user_row(i) for i in picks]
+        for row in found[::4]:
+            row["email"], row["phone_number"] = f"missing-{row['user_id']}@bench.example.com", "70000000000"
+
+        print(f"\nПользователей: {args.users}, обращений: {args.lookups}")
+        scan = bench(utils, pool, "OR (скан users)", "bench.user_by_email_or_phone_scan",
+                     [{"$email": r["email"], "$phone": r["phone_number"]} for r in found])
+        both = bench(utils, pool, "email_idx ∪ phone_idx", "bench.user_by_email_or_phone",
+                     [{"$email": r["email"], "$phone": r["phone_number"]} for r in found])
+        bench(utils, pool, "email_idx", "bench.user_by_email", [{"$email": r["email"]} for r in found])
+        bench(utils, pool, "phone_idx", "bench.user_by_phone", [{"$phone": r["phone_number"]} for r in found])
+        print(f"  ускорение email+phone: x{scan / both:.1f}")
+    finally:
+        pool.stop()
+        driver.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+get-user-data при USER_DATA_VERSIONS=true: ответ несет ETag, совпавший If-None-Match дает 304.
+Код функции берется из md «Python код - ✳️ get-user-data», YDB — заглушки ydb.aio.SessionPool
+(test_util_ydb_aio.py), чтение идет через настоящие read_many_async / read_one_async.
+
+    python -m pytest -q test_get_user_data_etag.py
+"""
+import os
+import re
+import types
+from pathlib import Path
+
+from test_util_ydb_aio import StubSessionPool, load_utils
+
+FUNCTION_MD = (
+    Path(__file__).resolve().parent.parent / "obsidian_prohandyman" / "𝒇 Функции" / "renzikov_hub functions"
+    / "✳️ get-user-data - CloudFunction функция" / "Python код - ✳️ get-user-data - CloudFunction функция"
+    / "index.py - ✳️ get-user-data - CloudFunction функция.md"
+)
+
+
+class _Column:
+    def __init__(self, name):
+        self.name = name
+
+
+class _ResultSet:
+    def __init__(self, rows):
+        self.columns = [_Column(name) for name in (rows[0] if rows else {})]
+        self.rows = rows
+
+
+class _RoutingSession:
+    """Строки по тексту запроса: подстрока YQL -> строки result set."""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.queries = []
+
+    def transaction(self, tx_mode=None):
+        session = self
+
+        class _Tx:
+            async def execute(self, query, params, commit_tx=False, settings=None):
+                session.queries.append(query.yql_text)
+                for marker, rows in session.routes.items():
+                    if marker in query.yql_text:
+                        return [_ResultSet(rows)]
+                raise AssertionError(f"unexpected query: {query.yql_text}")
+
+        return _Tx()
+
+
+class _Router:
+    def __init__(self, pools):
+        self.pools = pools
+
+    async def async_pool(self, name):
+        return self.pools[name]
+
+
+def load_function(env):
+    load_utils()
+    previous = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        source = "\n".join(re.findall(r"```python\n(.*?)\n```", FUNCTION_MD.read_text(encoding="utf-8"), re.S))
+        module = types.ModuleType("get_user_data_index")
+        exec(compile(source, str(FUNCTION_MD), "exec"), module.__dict__)
+        return module
+    finally:
+        for k, v in previous.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+def test_versions_enabled_returns_etag_and_304():
+    fn = load_function({"USER_DATA_VERSIONS": "true", "USER_DATA_VERSION_REFRESH_SEC": "0"})
+    from utils.util_cache.user_data_versions import user_data_bucket
+
+    firms_session = _RoutingSession({
+        "user_data_versions": [{"bucket": user_data_bucket("u1"), "version": 42}],
+        "FROM Users AS u": [{"firm_id": "f1", "firm_name": "Firm", "owner_user_id": "u1", "integrations_json": "{}"}],
+    })
+    auth_session = _RoutingSession({"FROM users": [{"user_id": "u1", "email": "u1@example.com", "user_name": "U"}]})
+    fn.get_router = lambda *a, **kw: _Router({"auth": StubSessionPool(auth_session), "firms": StubSessionPool(firms_session)})
+
+    event = {"httpMethod": "GET", "headers": {}, "queryStringParameters": {"user_id": "u1"}}
+    first = fn.handler(event, None)
+    assert first["statusCode"] == 200
+    etag = first["headers"].get("ETag")
+    assert etag, "USER_DATA_VERSIONS=true must produce an ETag"
+    assert first["headers"]["Cache-Control"] == "private, no-cache"
+
+    revalidated = fn.handler({**event, "headers": {"If-None-Match": etag}}, None)
+    assert revalidated["statusCode"] == 304
+    assert revalidated["body"] == ""
+
+
+if __name__ == "__main__":
+    test_versions_enabled_returns_etag_and_304()
+    print("ok")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Проверка асинхронного чтения utils/util_ydb/aio.py через настоящий ydb.aio.SessionPool.retry_operation
+(ретраи SDK, передача retry_settings), но без сети: checkout пула отдает заглушку сессии.
+
+    python -m pytest -q test_util_ydb_aio.py
+"""
+import asyncio
+import sys
+import types
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import ydb
+import ydb.aio
+
+UTILS_DIR = Path(__file__).resolve().parent.parent / "obsidian_prohandyman" / "𝒇 Функции" / "⚙️ utils"
+
+
+def load_utils() -> types.ModuleType:
+    """Пакет utils из «⚙️ utils» под именем utils, без исполнения его __init__ (там зависимости функций)."""
+    package = sys.modules.get("utils")
+    if package is None:
+        package = types.ModuleType("utils")
+        package.__path__ = [str(UTILS_DIR)]
+        sys.modules["utils"] = package
+    import utils.util_ydb.aio  # noqa: F401
+    import utils.util_ydb.queries  # noqa: F401
+    return package
+
+
+class _Column:
+    def __init__(self, name):
+        self.name = name
+
+
+class _ResultSet:
+    def __init__(self, rows):
+        self.columns = [_Column(name) for name in (rows[0] if rows else {})]
+        self.rows = rows
+
+
+class _Transaction:
+    def __init__(self, session):
+        self._session = session
+
+    async def execute(self, query, params, commit_tx=False, settings=None):
+        self._session.calls.append((params, commit_tx))
+        return [_ResultSet(self._session.rows)]
+
+
+class _Session:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def transaction(self, tx_mode=None):
+        return _Transaction(self)
+
+
+class StubSessionPool(ydb.aio.SessionPool):
+    """Настоящий retry_operation из SDK; вместо драйвера и сессий — одна заглушка."""
+
+    def __init__(self, session):  # noqa: D107 — базовый __init__ требует драйвер
+        self.session = session
+
+    def checkout(self, timeout=None, retry_timeout=None):
+        @asynccontextmanager
+        async def checkout():
+            yield self.session
+        return checkout()
+
+
+def test_read_one_async_through_session_pool():
+    utils = load_utils()
+    utils.util_ydb.queries.register_query("test_aio.user_by_id", """
+        SELECT user_id, email FROM users WHERE user_id = $user_id;
+    """, {"$user_id": "Utf8"})
+    session = _Session([{"user_id": "u1", "email": "u1@example.com"}])
+    pool = StubSessionPool(session)
+
+    row = asyncio.run(utils.util_ydb.aio.read_one_async(pool, "test_aio.user_by_id", {"$user_id": "u1"}))
+
+    assert row == {"user_id": "u1", "email": "u1@example.com"}
+    assert [commit for _, commit in session.calls] == [True]
+    assert list(session.calls[0][0]) == ["$user_id"]
+
+
+if __name__ == "__main__":
+    test_read_one_async_through_session_pool()
+    print("ok")